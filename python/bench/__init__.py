@@ -0,0 +1,5 @@
+#
+# Performance measurement tools. Not shipped - run from the python folder e.g. "py -m bench.startup".
+#
+# Each tool prints its results as JSON on stdout so runs can be saved and compared over time.
+#
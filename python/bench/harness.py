@@ -0,0 +1,161 @@
+#
+# Stand-in for EDMCHarness.dll, for load and latency testing without Windows or EDD.
+#
+# Writes stored.edd, current.edd and ui.edd the same way as PythonHarness/EDMCHarness/EDMCHarness.cs:
+#   - the files are deleted on initialise, and a Harness-Version line is written to stored
+#   - journal entries go to stored until the first refresh, which writes RefreshOver; after that they go to current
+#   - after the first refresh, stored entries for the same commander aren't sent again
+#   - on terminate ExitProgram is written to current and, once the program has had time to exit, the files are deleted
+#
+# Run EDD-EDMC, then e.g. "py -m bench.harness --stored 5000 --lines 100000 --rate 100 --burst 10" to replay a
+# synthetic commander history at 100 events a second into config.app_dir.
+#
+
+import argparse
+from collections import OrderedDict
+import json
+import os
+from os.path import join
+import sys
+import threading
+from time import gmtime, perf_counter, sleep, strftime
+
+from bench.synthetic import CommanderHistory, PROFILES
+
+VERSION = '0.0.0.0'	# reported in the Harness-Version line
+
+
+def timestamp():
+    # Zulu, truncated to seconds
+    return strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())
+
+
+class Harness(object):
+
+    def __init__(self, folder):
+        self.storedout = join(folder, 'stored.edd')
+        self.currentout = join(folder, 'current.edd')
+        self.uiout = join(folder, 'ui.edd')
+        self.lastcmdr = ''	# empty until first refresh, commander otherwise
+        self.lock = threading.Lock()
+
+    # EDDInitialise
+    def initialise(self, version=VERSION):
+        self.delete()
+        self.write(self.storedout, '{"timestamp":"%s","event":"Harness-Version","Version":"%s"}' % (timestamp(), version))
+
+    def new_version(self, version):
+        self.write(self.storedout, '{"timestamp":"%s","event":"Harness-NewVersion","Version":"%s"}' % (timestamp(), version))
+
+    # EDDTerminate
+    def terminate(self, wait=10):
+        self.write(self.currentout, '{"timestamp":"%s", "event":"ExitProgram"}' % timestamp())
+        sleep(wait)	# the dll waits up to 10s for the program to exit
+        self.delete()
+
+    # EDDRefresh
+    def refresh(self, cmdr):
+        filetoadd = self.lastcmdr and self.currentout or self.storedout
+        self.lastcmdr = cmdr
+        self.write(filetoadd, '{"timestamp":"%s", "event":"RefreshOver"}' % timestamp())
+
+    # EDDNewJournalEntry. Returns True if sent
+    def journal_entry(self, line, cmdr, stored):
+        if not stored or cmdr != self.lastcmdr:
+            self.write(self.lastcmdr and self.currentout or self.storedout, line)
+            return True
+        else:
+            return False
+
+    # EDDNewUIEvent
+    def ui_event(self, line):
+        self.write(self.uiout, line)
+
+    def write(self, filetoadd, text):
+        # Like File.AppendText + WriteLine - opened and closed for every line, UTF-8 without BOM, Windows line endings
+        with self.lock:
+            with open(filetoadd, 'at', encoding='utf-8', newline='\r\n') as h:
+                h.write(text + '\n')
+
+    def delete(self):
+        for path in [self.storedout, self.currentout, self.uiout]:
+            try:
+                os.remove(path)
+            except:
+                pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write stored.edd and current.edd like EDMCHarness.dll')
+    parser.add_argument('--folder', help='where to write (default config.app_dir)')
+    parser.add_argument('--stored', type=int, default=1000, help='history lines to send before the refresh (default %(default)s)')
+    parser.add_argument('--lines', type=int, default=10000, help='live lines to send after the refresh (default %(default)s)')
+    parser.add_argument('--rate', type=float, default=10, help='live lines per second, 0 for as fast as possible (default %(default)s)')
+    parser.add_argument('--burst', type=int, default=1, help='live lines written together (default %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default %(default)s)')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='default', help='event mix (default %(default)s)')
+    parser.add_argument('--new-version', help='also send a Harness-NewVersion with this version')
+    parser.add_argument('--exit-wait', type=float, default=10, help='seconds between ExitProgram and deleting the files (default %(default)s)')
+    parser.add_argument('--no-exit', dest='exit', action='store_false', help="leave the files and the program running at the end")
+    args = parser.parse_args()
+
+    if args.burst < 1:
+        parser.error('--burst must be at least 1')
+
+    if args.folder:
+        folder = args.folder
+    else:
+        from config import config
+        folder = config.app_dir
+
+    harness = Harness(folder)
+    history = CommanderHistory(args.seed, args.profile)
+    lines = history.lines(args.stored + args.lines)
+    cmdr = 'Jameson'	# CommanderHistory's commander
+
+    start = perf_counter()
+    harness.initialise()
+    if args.new_version:
+        harness.new_version(args.new_version)
+
+    # Refresh - EDD replays the history from its database
+    for line in (next(lines) for i in range(args.stored)):
+        harness.journal_entry(line, cmdr, True)
+    harness.refresh(cmdr)
+    refreshed = perf_counter()
+
+    # Live. Paced from the start time so sleep overshoot doesn't accumulate
+    sent = 0
+    try:
+        while sent < args.lines:
+            burst = [next(lines) for i in range(min(args.burst, args.lines - sent))]
+            for line in burst:
+                harness.journal_entry(line, cmdr, False)
+            sent += len(burst)
+            if args.rate:
+                delay = refreshed + sent / args.rate - perf_counter()
+                if delay > 0:
+                    sleep(delay)
+    except KeyboardInterrupt:
+        pass
+    finished = perf_counter()
+
+    if args.exit:
+        harness.terminate(args.exit_wait)
+
+    json.dump(OrderedDict([
+        ('benchmark', 'harness'),
+        ('folder', folder),
+        ('stored', args.stored),
+        ('stored_seconds', round(refreshed - start, 3)),
+        ('lines', sent),
+        ('seconds', round(finished - refreshed, 3)),
+        ('target_rate', args.rate or None),
+        ('achieved_rate', round(sent / (finished - refreshed), 1) if finished > refreshed else None),
+        ('burst', args.burst),
+    ]), sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
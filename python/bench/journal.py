@@ -0,0 +1,290 @@
+#
+# Journal replay benchmark.
+#
+# Replays a synthetic (or supplied) journal through each stage of the monitor pipeline and reports throughput,
+# per-event latency and peak memory as JSON:
+#   readfile - EDLogs.readfile on stored.edd, appended to in batches as the harness would
+#   parse    - EDLogs.parse_entry
+#   plugins  - plug.notify_journal_entry with stub plugins
+#   app      - Application.journal_event, including main window updates. Needs a display.
+#
+# python -m bench.journal --lines 100000 --output results.jsonl
+#
+
+import argparse
+from array import array
+from collections import OrderedDict
+import contextlib
+from itertools import islice
+import json
+import os
+from os.path import exists, join
+import random
+import shutil
+import sys
+import tempfile
+from time import gmtime, perf_counter, strftime
+import tracemalloc
+
+from bench.synthetic import CommanderHistory, PROFILES
+
+STAGES = ['readfile', 'parse', 'plugins', 'app']
+
+RESERVOIR = 100000	# latency samples kept for percentiles, so memory use doesn't grow with journal size
+ROTATE = 100000		# start a new stored.edd after this many lines, so disk use doesn't grow with journal size
+
+
+class Skip(Exception):
+    pass
+
+
+class Latencies(object):
+
+    def __init__(self, size=RESERVOIR):
+        self.size = size
+        self.samples = array('d')
+        self.count = 0
+        self.max = 0
+        self.random = random.Random(0)
+
+    def add(self, seconds):
+        self.count += 1
+        self.max = max(self.max, seconds)
+        if len(self.samples) < self.size:
+            self.samples.append(seconds)
+        else:
+            i = self.random.randrange(self.count)	# reservoir sampling
+            if i < self.size:
+                self.samples[i] = seconds
+
+    def percentile(self, p, samples):
+        return samples and samples[min(len(samples) - 1, int(len(samples) * p / 100))] or 0
+
+
+class StubRoot(object):
+    # Stands in for the Tk root that the monitor posts <<JournalEvent>>s to
+
+    def event_generate(self, *args, **kw):
+        pass
+
+
+def stub_plugins(count):
+    import types
+    import plug
+
+    def noop(cmdr, is_beta, system, station, entry, state):
+        pass
+
+    def cargo(cmdr, is_beta, system, station, entry, state):
+        # e.g. a cargo display
+        if entry['event'] in ['Cargo', 'MarketBuy', 'MarketSell']:
+            return '%d t' % sum(state['Cargo'].values())
+
+    def serialise(cmdr, is_beta, system, station, entry, state):
+        # e.g. queueing for upload to a website
+        json.dumps(entry)
+
+    kinds = [noop, cargo, serialise]
+    plugins = []
+    for i in range(count):
+        plugin = plug.Plugin('stub%d' % i, None)
+        plugin.module = types.SimpleNamespace(journal_entry=kinds[i % len(kinds)])
+        plugins.append(plugin)
+    return plugins
+
+
+def batches(journal, size):
+    with open(journal, 'rb') as h:
+        while True:
+            batch = list(islice(h, size))
+            if not batch:
+                return
+            yield batch
+
+
+# Stages. Each returns (number of events, total seconds, Latencies)
+
+def stage_readfile(journal, args):
+    from monitor import EDLogs
+    monitor = EDLogs()
+    monitor.root = StubRoot()
+    latencies = Latencies()
+    events = elapsed = 0
+    tempdir = tempfile.mkdtemp()
+    stored = join(tempdir, 'stored.edd')
+    try:
+        for batch in batches(journal, args.batch):
+            if events and not events % ROTATE:
+                os.remove(stored)
+                monitor.logposstored = 0
+            with open(stored, 'ab') as h:
+                h.writelines(batch)
+            start = perf_counter()
+            monitor.readfile(stored)
+            taken = perf_counter() - start
+            elapsed += taken
+            events += len(batch)
+            latencies.add(taken / len(batch))	# per event, averaged over the batch
+    finally:
+        shutil.rmtree(tempdir, ignore_errors=True)
+    return (events, elapsed, latencies)
+
+
+def stage_parse(journal, args):
+    from monitor import EDLogs
+    monitor = EDLogs()
+    latencies = Latencies()
+    events = elapsed = 0
+    with open(journal, 'rb') as h:
+        for line in h:
+            start = perf_counter()
+            monitor.parse_entry(line)
+            taken = perf_counter() - start
+            elapsed += taken
+            events += 1
+            latencies.add(taken)
+    return (events, elapsed, latencies)
+
+
+def stage_plugins(journal, args):
+    from monitor import EDLogs
+    import plug
+    monitor = EDLogs()
+    latencies = Latencies()
+    events = elapsed = 0
+    saved = list(plug.PLUGINS)
+    plug.PLUGINS[:] = stub_plugins(args.plugins)
+    try:
+        with open(journal, 'rb') as h:
+            for line in h:
+                entry = monitor.parse_entry(line)
+                start = perf_counter()
+                plug.notify_journal_entry(monitor.cmdr, monitor.is_beta, monitor.system, monitor.station, entry, monitor.state)
+                taken = perf_counter() - start
+                elapsed += taken
+                events += 1
+                latencies.add(taken)
+    finally:
+        plug.PLUGINS[:] = saved
+    return (events, elapsed, latencies)
+
+
+def stage_app(journal, args):
+    if sys.platform == 'linux' and not os.environ.get('DISPLAY'):
+        raise Skip('no display')	# theme needs an X display
+
+    import tkinter as tk
+    from l10n import Translations
+    import plug
+    import eddedmc
+    from monitor import monitor
+
+    Translations.install_dummy()
+    monitor.__init__()	# reset the singleton
+    monitor.start = lambda root: setattr(monitor, 'root', root)	# don't watch the real app_dir
+    load_plugins = plug.load_plugins
+    plug.load_plugins = lambda master: plug.PLUGINS.extend(stub_plugins(args.plugins))
+    saved = list(plug.PLUGINS)
+    del plug.PLUGINS[:]
+
+    root = tk.Tk()
+    latencies = Latencies()
+    events = elapsed = 0
+    try:
+        app = eddedmc.Application(root)
+        root.update()
+        for batch in batches(journal, args.batch):
+            monitor.event_queue.extend(batch)
+            start = perf_counter()
+            app.journal_event(None)
+            root.update()	# include deferred display updates
+            taken = perf_counter() - start
+            elapsed += taken
+            events += len(batch)
+            latencies.add(taken / len(batch))	# per event, averaged over the batch
+    finally:
+        root.destroy()
+        del monitor.start
+        plug.load_plugins = load_plugins
+        plug.PLUGINS[:] = saved
+    return (events, elapsed, latencies)
+
+
+def run(stage, journal, args):
+    function = globals()['stage_' + stage]
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):	# the monitor logs every line
+            (events, elapsed, latencies) = function(journal, args)
+            if args.memory:
+                tracemalloc.start()
+                function(journal, args)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+    except Skip as e:
+        return OrderedDict([('skipped', str(e))])
+
+    samples = sorted(latencies.samples)
+    return OrderedDict([
+        ('events', events),
+        ('seconds', round(elapsed, 6)),
+        ('events_per_sec', round(events / elapsed, 1) if elapsed else None),
+        ('p50_us', round(latencies.percentile(50, samples) * 1e6, 3)),
+        ('p99_us', round(latencies.percentile(99, samples) * 1e6, 3)),
+        ('max_us', round(latencies.max * 1e6, 3)),
+        ('peak_memory_kb', round(peak / 1024) if args.memory else None),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a journal through the monitor, plugins and main window')
+    parser.add_argument('--lines', type=int, default=10000, help='lines of synthetic journal (default %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default %(default)s)')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='default', help='event mix (default %(default)s)')
+    parser.add_argument('--journal', help='replay this journal instead of generating one')
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma separated stages to run (default %(default)s)')
+    parser.add_argument('--batch', type=int, default=100, help='lines per append for readfile and app (default %(default)s)')
+    parser.add_argument('--plugins', type=int, default=6, help='number of stub plugins (default %(default)s)')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="don't measure peak memory (saves a second pass)")
+    parser.add_argument('--output', help='append results as a line of JSON to this file, instead of printing')
+    args = parser.parse_args()
+
+    stages = args.stages.split(',')
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error('unknown stage %s' % stage)
+
+    if args.journal:
+        if not exists(args.journal):
+            parser.error('%s not found' % args.journal)
+        journal = args.journal
+    else:
+        (fd, journal) = tempfile.mkstemp(suffix='.edd')
+        with os.fdopen(fd, 'wt', encoding='utf-8') as h:
+            for line in CommanderHistory(args.seed, args.profile).lines(args.lines):
+                h.write(line + '\n')
+
+    try:
+        results = OrderedDict([
+            ('benchmark', 'journal'),
+            ('timestamp', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())),
+            ('python', sys.version.split()[0]),
+            ('platform', sys.platform),
+            ('journal', args.journal or OrderedDict([('lines', args.lines), ('seed', args.seed), ('profile', args.profile)])),
+            ('batch', args.batch),
+            ('plugins', args.plugins),
+            ('stages', OrderedDict((stage, run(stage, journal, args)) for stage in stages)),
+        ])
+    finally:
+        if not args.journal:
+            os.remove(journal)
+
+    if args.output:
+        with open(args.output, 'at') as h:
+            h.write(json.dumps(results) + '\n')
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#
+# Number formatting - per call vs a whole column at once, against the old locale.format_string per call.
+#
+
+import argparse
+from collections import OrderedDict
+import json
+import locale
+import random
+import sys
+from time import perf_counter
+
+
+def timed(function, runs):
+    best = None
+    for i in range(runs):
+        start = perf_counter()
+        function()
+        taken = perf_counter() - start
+        best = best is None and taken or min(best, taken)
+    return round(best * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure number formatting')
+    parser.add_argument('--count', type=int, default=10000, help='numbers to format (default %(default)s)')
+    parser.add_argument('--decimals', type=int, help='decimal places (default 5 for floats, none for ints)')
+    parser.add_argument('--locale', help='locale to use e.g. de_DE.UTF-8 (default the user\'s)')
+    parser.add_argument('--runs', type=int, default=5, help='number of runs, best is reported (default %(default)s)')
+    args = parser.parse_args()
+
+    from l10n import Locale	# sets the user's locale
+    if args.locale:
+        locale.setlocale(locale.LC_ALL, args.locale)
+
+    # e.g. a cargo or materials table - counts and distances
+    r = random.Random(0)
+    values = [r.randint(0, 10**6) for i in range(args.count // 2)] + [r.uniform(0, 10**5) for i in range(args.count - args.count // 2)]
+
+    def legacy():
+        for value in values:
+            if args.decimals == 0 and not isinstance(value, int):
+                value = int(round(value))
+            if not args.decimals and isinstance(value, int):
+                locale.format_string('%d', value, True)
+            else:
+                locale.format_string('%.*f', (args.decimals or 5, value), True)
+
+    def per_call():
+        for value in values:
+            Locale.stringFromNumber(value, args.decimals)
+
+    def bulk():
+        Locale.format_many(values, args.decimals)
+
+    strings = Locale.format_many(values, args.decimals)
+
+    def parse():
+        for string in strings:
+            Locale.numberFromString(string)
+
+    report = OrderedDict([
+        ('benchmark', 'l10n'),
+        ('python', sys.version.split()[0]),
+        ('locale', locale.setlocale(locale.LC_NUMERIC)),
+        ('count', args.count),
+        ('decimals', args.decimals),
+        ('runs', args.runs),
+        ('locale_format_ms', timed(legacy, args.runs)),
+        ('stringFromNumber_ms', timed(per_call, args.runs)),
+        ('format_many_ms', timed(bulk, args.runs)),
+        ('numberFromString_ms', timed(parse, args.runs)),
+    ])
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
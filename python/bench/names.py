@@ -0,0 +1,93 @@
+#
+# Cost of EDLogs.canonicalise and category when replaying a material-heavy journal, with and without remembering
+# results.
+#
+# python -m bench.names --lines 100000
+#
+
+import argparse
+from collections import OrderedDict
+import contextlib
+import json
+import os
+import sys
+from time import perf_counter
+
+from bench.synthetic import CommanderHistory, PROFILES
+
+
+def replay(lines):
+    from monitor import EDLogs
+    monitor = EDLogs()
+    start = perf_counter()
+    for line in lines:
+        monitor.parse_entry(line)
+    return perf_counter() - start
+
+
+def timed(function, items, runs):
+    best = None
+    for i in range(runs):
+        start = perf_counter()
+        for item in items:
+            function(item)
+        taken = perf_counter() - start
+        best = best is None and taken or min(best, taken)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure canonicalise and category on a material-heavy replay')
+    parser.add_argument('--lines', type=int, default=100000, help='lines of synthetic journal (default %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default %(default)s)')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='materials', help='event mix (default %(default)s)')
+    parser.add_argument('--runs', type=int, default=3, help='number of runs, best is reported (default %(default)s)')
+    args = parser.parse_args()
+
+    from monitor import EDLogs
+    lines = list(CommanderHistory(args.seed, args.profile).lines(args.lines))
+    cached = (EDLogs.canonicalise, EDLogs.category)
+
+    # The names that the replay looks up
+    calls = []
+    def recorder(function):
+        def record(item):
+            calls.append(item)
+            return function(item)
+        return record
+
+    results = OrderedDict()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for (name, canonicalise, category) in [('uncached', cached[0].__wrapped__, cached[1].__wrapped__), ('cached', cached[0], cached[1])]:
+            EDLogs.canonicalise = staticmethod(canonicalise)
+            EDLogs.category = staticmethod(category)
+            best = None
+            for i in range(args.runs):
+                taken = replay(lines)
+                best = best is None and taken or min(best, taken)
+            results[name] = OrderedDict([
+                ('seconds', round(best, 6)),
+                ('events_per_sec', round(len(lines) / best, 1)),
+            ])
+        EDLogs.canonicalise = staticmethod(recorder(cached[0]))
+        replay(lines)
+    (EDLogs.canonicalise, EDLogs.category) = (staticmethod(cached[0]), staticmethod(cached[1]))
+    results['uncached']['canonicalise_ns'] = round(timed(cached[0].__wrapped__, calls, args.runs) / len(calls) * 1e9, 1)
+    results['cached']['canonicalise_ns'] = round(timed(cached[0], calls, args.runs) / len(calls) * 1e9, 1)
+
+    info = EDLogs.canonicalise.cache_info()
+    json.dump(OrderedDict([
+        ('benchmark', 'names'),
+        ('python', sys.version.split()[0]),
+        ('journal', OrderedDict([('lines', args.lines), ('seed', args.seed), ('profile', args.profile)])),
+        ('runs', args.runs),
+        ('canonicalise_calls', len(calls)),
+        ('uncached', results['uncached']),
+        ('cached', results['cached']),
+        ('canonicalise_cache', OrderedDict([('hits', info.hits), ('misses', info.misses), ('size', info.currsize)])),
+    ]), sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#
+# Startup import cost, measured with "python -X importtime".
+#
+# Imports the main program in a fresh interpreter several times and reports the best run, plus the most expensive
+# modules. Exits non-zero if a module that should only be imported on demand is imported at startup, or if the
+# total exceeds --budget, so it can be used as a regression check.
+#
+
+import argparse
+from collections import OrderedDict
+import json
+import re
+import subprocess
+import sys
+from os.path import abspath, dirname
+
+APPDIR = dirname(dirname(abspath(__file__)))
+
+# Only needed when the user clicks on something - see eddedmc.py
+DEFERRED = [
+    'prefs',
+    'companion',
+    'tkinter.colorchooser',
+    'tkinter.filedialog',
+    'tkinter.messagebox',
+    'webbrowser',
+]
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)\s*$')
+
+
+def importtime(module):
+    # Returns list of (name, depth, self us, cumulative us) in the order reported
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+                            cwd=APPDIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode:
+        raise Exception('import %s failed (%d):\n%s' % (module, result.returncode, '\n'.join(result.stderr.splitlines()[-20:])))
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            imports.append((match.group(4), len(match.group(3)) // 2, int(match.group(1)), int(match.group(2))))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure startup import time')
+    parser.add_argument('--module', default='eddedmc', help='module to import (default %(default)s)')
+    parser.add_argument('--runs', type=int, default=5, help='number of runs, best is reported (default %(default)s)')
+    parser.add_argument('--top', type=int, default=15, help='number of most expensive modules to list (default %(default)s)')
+    parser.add_argument('--budget', type=float, help='fail if the total import time exceeds this many ms')
+    args = parser.parse_args()
+
+    best = None
+    for i in range(args.runs):
+        imports = importtime(args.module)
+        total = sum(x[3] for x in imports if x[1] == 0 and x[0] == args.module)	# excludes interpreter startup
+        if best is None or total < best[0]:
+            best = (total, imports)
+
+    (total, imports) = best
+    imported = set(x[0] for x in imports)
+    report = OrderedDict([
+        ('module', args.module),
+        ('python', sys.version.split()[0]),
+        ('runs', args.runs),
+        ('total_ms', total / 1000),
+        ('modules', len(imports)),
+        ('top', [OrderedDict([('module', x[0]), ('self_ms', x[2] / 1000), ('cumulative_ms', x[3] / 1000)])
+                 for x in sorted(imports, key=lambda x: x[2], reverse=True)[:args.top]]),
+        ('deferred_imported', [x for x in DEFERRED if x in imported]),
+    ])
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+    if report['deferred_imported']:
+        sys.stderr.write('Imported at startup: %s\n' % ', '.join(report['deferred_imported']))
+        return 1
+    elif args.budget is not None and report['total_ms'] > args.budget:
+        sys.stderr.write('Startup import time %.1fms exceeds budget %.1fms\n' % (report['total_ms'], args.budget))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
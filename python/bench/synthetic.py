@@ -0,0 +1,406 @@
+#
+# Synthetic commander history, for replaying through the monitor and plugins.
+#
+# Produces a plausible journal: a startup sequence followed by a weighted mix of travel, trading, material gathering
+# and engineering. Events are consistent with each other (e.g. EngineerCraft only targets fitted modules, MarketSell
+# only sells cargo that is held) so that EDLogs.parse_entry goes down the same paths as it would for a real journal.
+#
+# python -m bench.synthetic --lines 1000000 journal.edd
+#
+
+import argparse
+from collections import OrderedDict
+import json
+import random
+import sys
+import zlib
+from calendar import timegm
+from time import gmtime, strftime, strptime
+
+# Relative frequencies, roughly those of a real commander's journal
+PROFILES = {
+    'default': {
+        'FSDJump'           : 20,
+        'Scan'              : 25,
+        'FSSDiscoveryScan'  : 6,
+        'Music'             : 10,
+        'ReceiveText'       : 8,
+        'FuelScoop'         : 6,
+        'Docked'            : 4,	# alternates with Undocked
+        'MarketBuy'         : 3,
+        'MarketSell'        : 3,
+        'Cargo'             : 4,
+        'MaterialCollected' : 6,
+        'MaterialDiscarded' : 1,
+        'Synthesis'         : 1,
+        'EngineerCraft'     : 1,
+        'MissionCompleted'  : 2,
+        'Loadout'           : 1,
+        'Statistics'        : 0.2,
+        'Friends'           : 0.5,
+    },
+    # For exercising the materials / engineering paths
+    'materials': {
+        'FSDJump'           : 4,
+        'Scan'              : 4,
+        'MaterialCollected' : 40,
+        'MaterialDiscarded' : 4,
+        'Synthesis'         : 10,
+        'EngineerCraft'     : 10,
+        'MaterialTrade'     : 4,
+        'MissionCompleted'  : 4,
+        'Materials'         : 1,
+        'Cargo'             : 2,
+        'Loadout'           : 2,
+    },
+}
+
+MATERIALS = {
+    'Raw'          : ['carbon', 'iron', 'nickel', 'phosphorus', 'sulphur', 'manganese', 'chromium', 'vanadium', 'zinc',
+                      'germanium', 'arsenic', 'zirconium', 'niobium', 'molybdenum', 'tungsten', 'selenium', 'tin',
+                      'cadmium', 'mercury', 'yttrium', 'technetium', 'ruthenium', 'tellurium', 'polonium', 'antimony'],
+    'Manufactured' : ['chemicalprocessors', 'conductivecomponents', 'heatconductionwiring', 'mechanicalscrap',
+                      'gridresistors', 'hybridcapacitors', 'wornshieldemitters', 'compactcomposites', 'salvagedalloys',
+                      'heatdispersionplate', 'phasealloys', 'focuscrystals', 'refinedfocuscrystals',
+                      'heatvanes', 'precipitatedalloys', 'thermicalloys', 'militarygradealloys', 'polymercapacitors',
+                      'exquisitefocuscrystals', 'configurablecomponents', 'fedcorecomposites', 'imperialshielding'],
+    'Encoded'      : ['shieldcyclerecordings', 'emissiondata', 'scandatabanks', 'legacyfirmware', 'disruptedwakeechoes',
+                      'fsdtelemetry', 'shieldsoakanalysis', 'encryptedfiles', 'bulkscandata', 'wakesolutions',
+                      'shielddensityreports', 'decodedemissiondata', 'archivedemissiondata', 'industrialfirmware',
+                      'securityfirmware', 'dataminedwake', 'compactemissionsdata', 'classifiedscandata'],
+}
+
+COMMODITIES = ['gold', 'silver', 'palladium', 'painite', 'tritium', 'water', 'hydrogenfuel', 'biowaste',
+               'consumertechnology', 'performanceenhancers', 'progenitorcells', 'superconductors', 'beer', 'wine',
+               'liquor', 'tobacco', 'fish', 'foodcartridges', 'coffee', 'tea', 'animalmeat', 'grain', 'drones']
+
+SYSTEMS = ['Shinrarta Dezhra', 'Sol', 'Achenar', 'Deciat', 'Colonia', 'Jameson', 'Hutton', 'Maia', 'Merope',
+           'Lave', 'Diso', 'Leesti', 'Zaonce', 'Riedquat', 'Orrere', 'Sothis', 'Ceos', 'Robigo', 'Wolf 397',
+           'LHS 3447', 'Eravate', 'Asellus Primus', 'Eranin', 'I Bootis', 'Dahan', 'Alioth', 'Sirius', 'Wyrd']
+
+STATIONS = ['Jameson Memorial', 'Abraham Lincoln', 'Galileo', 'Daedalus', 'Hutton Orbital', 'Lave Station',
+            'Reilly Hub', 'Jaques Station', 'Ray Gateway', 'Ehrlich City', 'Farseer Inc', 'Polo Harbour']
+
+ENGINEERS = [('Felicity Farseer', 300100), ('Elvira Martuuk', 300160), ('The Dweller', 300180),
+             ('Marco Qwent', 300200), ('Selene Jean', 300210), ('Lei Cheung', 300120), ('Tod McQuinn', 300260)]
+
+SHIP = 'python'
+LOADOUT = [
+    ('LargeHardpoint1',  'hpt_pulselaser_fixed_large'),
+    ('MediumHardpoint1', 'hpt_multicannon_gimbal_medium'),
+    ('MediumHardpoint2', 'hpt_multicannon_gimbal_medium'),
+    ('TinyHardpoint1',   'hpt_shieldbooster_size0_class5'),
+    ('TinyHardpoint2',   'hpt_heatsinklauncher_turret_tiny'),
+    ('Armour',           'python_armour_grade1'),
+    ('PowerPlant',       'int_powerplant_size7_class5'),
+    ('MainEngines',      'int_engine_size6_class5'),
+    ('FrameShiftDrive',  'int_hyperdrive_size5_class5'),
+    ('LifeSupport',      'int_lifesupport_size4_class2'),
+    ('PowerDistributor', 'int_powerdistributor_size7_class5'),
+    ('Radar',            'int_sensors_size5_class2'),
+    ('FuelTank',         'int_fueltank_size5_class3'),
+    ('Slot01_Size6',     'int_cargorack_size6_class1'),
+    ('Slot02_Size6',     'int_shieldgenerator_size6_class5'),
+    ('Slot03_Size6',     'int_cargorack_size5_class1'),
+    ('Slot04_Size5',     'int_fuelscoop_size5_class5'),
+    ('Slot05_Size5',     'int_cargorack_size4_class1'),
+    ('Slot06_Size4',     'int_hullreinforcement_size4_class2'),
+    ('Slot07_Size3',     'int_dronecontrol_collection_size3_class5'),
+    ('PlanetaryApproachSuite', 'int_planetapproachsuite'),
+    ('ShipCockpit',      'python_cockpit'),
+    ('CargoHatch',       'modularcargobaydoor'),
+]
+CARGO_CAPACITY = 144
+
+
+class CommanderHistory(object):
+
+    def __init__(self, seed=0, profile='default', start='3306-01-01T00:00:00Z'):
+        self.random = random.Random(seed)
+        weights = PROFILES[profile]
+        self.events = list(weights)
+        self.cumweights = []
+        total = 0
+        for name in self.events:
+            total += weights[name]
+            self.cumweights.append(total)
+        self.time = timegm(strptime(start, '%Y-%m-%dT%H:%M:%SZ'))
+        self.system = self.random.choice(SYSTEMS)
+        self.station = None
+        self.cargo = {}
+        self.materials = { category: {} for category in MATERIALS }
+        self.modules = OrderedDict(LOADOUT)
+
+    def lines(self, count):
+        # Generate count journal lines, as JSON strings without line endings
+        n = 0
+        while n < count:
+            for entry in self.startup() if not n else self.next():
+                yield json.dumps(entry, separators=(', ', ':'))
+                n += 1
+                if n >= count:
+                    return
+
+    def entry(self, event, **kw):
+        self.time += self.random.randint(1, 30)
+        entry = OrderedDict([('timestamp', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime(self.time))), ('event', event)])
+        entry.update(kw)
+        return entry
+
+    def startup(self):
+        r = self.random
+        for category in MATERIALS:
+            for name in r.sample(MATERIALS[category], len(MATERIALS[category]) // 2):
+                self.materials[category][name] = r.randint(1, 150)
+        return [
+            self.entry('Fileheader', part=1, language='English\\UK', gameversion='3.7.7.500', build='r229130/r0 '),
+            self.entry('Commander', FID='F1234567', Name='Jameson'),
+            self.entry('LoadGame', FID='F1234567', Commander='Jameson', Horizons=True, Ship=SHIP.capitalize(), ShipID=1,
+                       ShipName='Synthetic', ShipIdent='SY-01', FuelLevel=32.0, FuelCapacity=32.0, GameMode='Solo',
+                       Credits=r.randint(10**6, 10**10), Loan=0),
+            self.entry('Rank', Combat=5, Trade=6, Explore=7, Empire=3, Federation=4, CQC=0),
+            self.entry('Progress', Combat=40, Trade=12, Explore=85, Empire=0, Federation=60, CQC=0),
+            self.entry('Reputation', Empire=25.0, Federation=75.0, Alliance=50.0),
+            self.entry('EngineerProgress', Engineers=[OrderedDict([('Engineer', name), ('EngineerID', id),
+                                                                   ('Progress', 'Unlocked'), ('RankProgress', 0),
+                                                                   ('Rank', 5)]) for (name, id) in ENGINEERS]),
+            self.materials_entry(),
+            self.loadout(),
+            self.cargo_entry(),
+            self.entry('Location', Docked=False, StarSystem=self.system, SystemAddress=self.address(self.system),
+                       StarPos=self.starpos(self.system), Population=r.randint(0, 10**9)),
+        ]
+
+    def next(self):
+        event = self.random.choices(self.events, cum_weights=self.cumweights)[0]
+        return getattr(self, 'gen_' + event, lambda: [self.entry(event)])()
+
+    # Helpers
+
+    def address(self, system):
+        return zlib.crc32(system.encode('utf-8')) | 0x1000000000	# not hash() - that varies between runs
+
+    def starpos(self, system):
+        h = zlib.crc32(system.encode('utf-8'))
+        return [round((h & 0xffff) / 100.0, 5), round(((h >> 16) & 0xfff) / 100.0, 5), round(((h >> 28) & 0xffff) / 100.0, 5)]
+
+    def loadout(self):
+        r = self.random
+        modules = []
+        for (slot, item) in self.modules.items():
+            module = OrderedDict([('Slot', slot), ('Item', item), ('On', True), ('Priority', r.randint(0, 4)),
+                                  ('Health', 1.0), ('Value', r.randint(1000, 10**7))])
+            if 'Hardpoint' in slot and not slot.startswith('TinyHardpoint'):
+                module['AmmoInClip'] = 90
+                module['AmmoInHopper'] = 2100
+            modules.append(module)
+        return self.entry('Loadout', Ship=SHIP, ShipID=1, ShipName='Synthetic', ShipIdent='SY-01',
+                          HullValue=56978179, ModulesValue=r.randint(10**7, 10**8), HullHealth=1.0,
+                          UnladenMass=567.2, CargoCapacity=CARGO_CAPACITY,
+                          MaxJumpRange=29.6, FuelCapacity={'Main': 32.0, 'Reserve': 0.83}, Rebuy=r.randint(10**6, 10**7),
+                          Modules=modules)
+
+    def cargo_entry(self):
+        return self.entry('Cargo', Vessel='Ship', Count=sum(self.cargo.values()),
+                          Inventory=[OrderedDict([('Name', name), ('Name_Localised', name.capitalize()),
+                                                  ('Count', count), ('Stolen', 0)])
+                                     for (name, count) in sorted(self.cargo.items())])
+
+    def materials_entry(self):
+        return self.entry('Materials', **OrderedDict(
+            (category, [OrderedDict([('Name', name), ('Count', count)]) for (name, count) in sorted(self.materials[category].items())])
+            for category in MATERIALS))
+
+    def ingredients(self, n):
+        ingredients = []
+        for category in self.random.sample(list(MATERIALS), n):
+            if self.materials[category]:
+                name = self.random.choice(list(self.materials[category]))
+                count = min(self.materials[category][name], self.random.randint(1, 5))
+                self.spend(category, name, count)
+                ingredients.append(OrderedDict([('Name', name), ('Count', count)]))
+        return ingredients
+
+    def spend(self, category, name, count):
+        self.materials[category][name] -= count
+        if self.materials[category][name] <= 0:
+            self.materials[category].pop(name)
+
+    # Event generators
+
+    def gen_FSDJump(self):
+        r = self.random
+        undock = self.station and self.gen_Undocked() or []
+        self.system = r.choice(SYSTEMS)
+        return undock + [
+            self.entry('StartJump', JumpType='Hyperspace', StarSystem=self.system, StarClass='K'),
+            self.entry('FSDJump', StarSystem=self.system, SystemAddress=self.address(self.system),
+                       StarPos=self.starpos(self.system), SystemAllegiance='Federation',
+                       SystemEconomy='$economy_Industrial;', SystemEconomy_Localised='Industrial',
+                       SystemGovernment='$government_Democracy;', SystemGovernment_Localised='Democracy',
+                       SystemSecurity='$SYSTEM_SECURITY_high;', SystemSecurity_Localised='High Security',
+                       Population=r.randint(0, 10**9), Body=self.system, BodyID=0, BodyType='Star',
+                       JumpDist=round(r.uniform(5, 30), 3), FuelUsed=round(r.uniform(1, 5), 6), FuelLevel=round(r.uniform(5, 32), 6),
+                       Factions=[OrderedDict([('Name', '%s Faction %d' % (self.system, i)), ('FactionState', 'None'),
+                                              ('Government', 'Democracy'), ('Influence', round(r.random(), 6)),
+                                              ('Allegiance', 'Federation'), ('Happiness', '$Faction_HappinessBand2;'),
+                                              ('MyReputation', round(r.uniform(-100, 100), 6))]) for i in range(r.randint(3, 7))]),
+        ]
+
+    def gen_Scan(self):
+        r = self.random
+        return [self.entry('Scan', ScanType='Detailed', BodyName='%s %d' % (self.system, r.randint(1, 12)),
+                           BodyID=r.randint(1, 40), DistanceFromArrivalLS=round(r.uniform(10, 5000), 6),
+                           TidalLock=False, TerraformState='', PlanetClass='Icy body', Atmosphere='',
+                           Volcanism='', MassEM=round(r.random(), 6), Radius=round(r.uniform(1e6, 1e7), 3),
+                           SurfaceGravity=round(r.uniform(0.1, 20), 6), SurfaceTemperature=round(r.uniform(20, 800), 6),
+                           Landable=r.random() < 0.3, WasDiscovered=True, WasMapped=False)]
+
+    def gen_Docked(self):
+        if self.station:
+            return self.gen_Undocked()
+        r = self.random
+        self.station = r.choice(STATIONS)
+        requested = self.entry('DockingRequested', StationName=self.station)
+        docked = self.entry('Docked', StationName=self.station, StationType='Coriolis', StarSystem=self.system,
+                            SystemAddress=self.address(self.system), MarketID=r.randint(128000000, 129000000),
+                            StationFaction={'Name': '%s Faction 0' % self.system}, StationGovernment='$government_Democracy;',
+                            StationServices=['dock', 'autodock', 'commodities', 'contacts', 'exploration', 'missions',
+                                             'outfitting', 'crewlounge', 'rearm', 'refuel', 'repair', 'shipyard'],
+                            StationEconomy='$economy_Industrial;', DistFromStarLS=round(r.uniform(10, 5000), 6))
+        return [requested, docked]
+
+    def gen_Undocked(self):
+        station, self.station = self.station, None
+        return [self.entry('Undocked', StationName=station, StationType='Coriolis')]
+
+    def gen_MarketBuy(self):
+        if not self.station:
+            return self.gen_Docked()
+        name = self.random.choice(COMMODITIES)
+        count = min(self.random.randint(1, 64), CARGO_CAPACITY - sum(self.cargo.values()))
+        if count <= 0:
+            return self.gen_MarketSell()
+        self.cargo[name] = self.cargo.get(name, 0) + count
+        return [self.entry('MarketBuy', MarketID=128000000, Type=name, Count=count, BuyPrice=1000, TotalCost=count * 1000),
+                self.cargo_entry()]
+
+    def gen_MarketSell(self):
+        if not self.station:
+            return self.gen_Docked()
+        elif not self.cargo:
+            return self.gen_MarketBuy()
+        name = self.random.choice(sorted(self.cargo))
+        count = self.random.randint(1, self.cargo[name])
+        self.cargo[name] -= count
+        if not self.cargo[name]:
+            self.cargo.pop(name)
+        return [self.entry('MarketSell', MarketID=128000000, Type='$%s_name;' % name, Count=count, SellPrice=1200,
+                           TotalSale=count * 1200, AvgPricePaid=1000),
+                self.cargo_entry()] + (self.gen_Undocked() if self.random.random() < 0.3 else [])
+
+    def gen_Cargo(self):
+        return [self.cargo_entry()]
+
+    def gen_MaterialCollected(self):
+        category = self.random.choice(list(MATERIALS))
+        name = self.random.choice(MATERIALS[category])
+        count = self.random.randint(1, 3)
+        self.materials[category][name] = self.materials[category].get(name, 0) + count
+        return [self.entry('MaterialCollected', Category=category, Name=name, Count=count)]
+
+    def gen_MaterialDiscarded(self):
+        category = self.random.choice(list(MATERIALS))
+        if not self.materials[category]:
+            return self.gen_MaterialCollected()
+        name = self.random.choice(sorted(self.materials[category]))
+        count = min(self.materials[category][name], self.random.randint(1, 3))
+        self.spend(category, name, count)
+        return [self.entry('MaterialDiscarded', Category=category, Name=name, Count=count)]
+
+    def gen_MaterialTrade(self):
+        category = self.random.choice(list(MATERIALS))
+        if not self.materials[category]:
+            return self.gen_MaterialCollected()
+        paid = self.random.choice(sorted(self.materials[category]))
+        quantity = min(self.materials[category][paid], 6)
+        self.spend(category, paid, quantity)
+        received = self.random.choice(MATERIALS[category])
+        self.materials[category][received] = self.materials[category].get(received, 0) + 1
+        return [self.entry('MaterialTrade', MarketID=128000000, TraderType=category.lower(),
+                           Paid=OrderedDict([('Material', paid), ('Category', category), ('Quantity', quantity)]),
+                           Received=OrderedDict([('Material', received), ('Category', category), ('Quantity', 1)]))]
+
+    def gen_Materials(self):
+        return [self.materials_entry()]
+
+    def gen_Synthesis(self):
+        return [self.entry('Synthesis', Name='FSD Basic', Materials=self.ingredients(2))]
+
+    def gen_EngineerCraft(self):
+        r = self.random
+        slot = r.choice(list(self.modules))
+        (engineer, engineerid) = r.choice(ENGINEERS)
+        entry = self.entry('EngineerCraft', Slot=slot, Module=self.modules[slot], Ingredients=self.ingredients(3),
+                           Engineer=engineer, EngineerID=engineerid, BlueprintID=128673000 + r.randint(0, 999),
+                           BlueprintName='Misc_LightWeight', Level=r.randint(1, 5), Quality=round(r.random(), 6),
+                           Modifiers=[OrderedDict([('Label', 'Mass'), ('Value', 1.2), ('OriginalValue', 1.3), ('LessIsGood', 1)]),
+                                      OrderedDict([('Label', 'Integrity'), ('Value', 40.0), ('OriginalValue', 51.0), ('LessIsGood', 0)])])
+        if r.random() < 0.3:
+            entry['ExperimentalEffect'] = 'special_lightweight'
+            entry['ExperimentalEffect_Localised'] = 'Lightweight'
+        return [entry]
+
+    def gen_MissionCompleted(self):
+        r = self.random
+        entry = self.entry('MissionCompleted', Faction='%s Faction 0' % self.system, Name='Mission_Delivery_name',
+                           MissionID=r.randint(10**8, 10**9), Reward=r.randint(10**4, 10**6))
+        if r.random() < 0.5:
+            category = r.choice(list(MATERIALS))
+            name = r.choice(MATERIALS[category])
+            self.materials[category][name] = self.materials[category].get(name, 0) + 3
+            entry['MaterialsReward'] = [OrderedDict([('Name', '$%s_name;' % name), ('Category', '$MICRORESOURCE_CATEGORY_%s;' % category),
+                                                     ('Count', 3)])]
+        return [entry]
+
+    def gen_Loadout(self):
+        return [self.loadout()]
+
+    def gen_Statistics(self):
+        r = self.random
+        return [self.entry('Statistics', **OrderedDict(
+            (section, OrderedDict(('%s_Stat_%d' % (section, i), r.randint(0, 10**9)) for i in range(12)))
+            for section in ['Bank_Account', 'Combat', 'Crime', 'Smuggling', 'Trading', 'Mining', 'Exploration',
+                            'Passengers', 'Search_And_Rescue', 'Crafting', 'Crew', 'Multicrew', 'Material_Trader_Stats']))]
+
+    def gen_Friends(self):
+        return [self.entry('Friends', Status=self.random.choice(['Online', 'Offline']), Name='Cmdr %d' % self.random.randint(1, 50))]
+
+    def gen_FuelScoop(self):
+        return [self.entry('FuelScoop', Scooped=round(self.random.uniform(0.5, 5), 6), Total=32.0)]
+
+    def gen_ReceiveText(self):
+        return [self.entry('ReceiveText', From='$npc_name_decorate:#name=Someone;', Message='$Pirate_OnStartScanCargo07;',
+                           Channel='npc')]
+
+    def gen_Music(self):
+        return [self.entry('Music', MusicTrack=self.random.choice(['Exploration', 'Supercruise', 'DestinationFromHyperspace']))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic journal')
+    parser.add_argument('--lines', type=int, default=10000, help='number of lines (default %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default %(default)s)')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='default', help='event mix (default %(default)s)')
+    parser.add_argument('output', nargs='?', help='output file (default stdout)')
+    args = parser.parse_args()
+
+    h = args.output and open(args.output, 'wt', encoding='utf-8') or sys.stdout
+    for line in CommanderHistory(args.seed, args.profile).lines(args.lines):
+        h.write(line + '\n')
+    if args.output:
+        h.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#
+# Cost of theme.apply over a main window with many plugin widgets. Needs a display.
+#
+# Reports the cost of re-theming every widget (what a palette change costs) and of an apply() where nothing has
+# changed (what every <Map> of the main window costs), and checks that destroyed widgets leave the registry.
+#
+
+import argparse
+from collections import OrderedDict
+import json
+import os
+import sys
+from time import perf_counter
+
+import tkinter as tk
+from tkinter import ttk
+
+
+def build(frame, count):
+    # A mix of the widgets that plugins typically put in the main window
+    from ttkHyperlinkLabel import HyperlinkLabel
+    kinds = [
+        lambda parent: tk.Label(parent, text='Label'),
+        lambda parent: tk.Button(parent, text='Button'),
+        lambda parent: ttk.Label(parent, text='ttk.Label'),
+        lambda parent: HyperlinkLabel(parent, text='Link', url='https://example.com'),
+        lambda parent: tk.Entry(parent),
+        lambda parent: tk.Canvas(parent, width=10, height=10),
+    ]
+    for i in range(0, count, 10):
+        plugin = tk.Frame(frame)
+        plugin.grid(sticky=tk.EW)
+        for j in range(min(9, count - i - 1)):
+            kinds[j % len(kinds)](plugin).grid(row=j // 3, column=j % 3)
+
+
+def timed(function, runs):
+    best = None
+    for i in range(runs):
+        start = perf_counter()
+        function()
+        taken = perf_counter() - start
+        best = best is None and taken or min(best, taken)
+    return round(best * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cost of applying the theme')
+    parser.add_argument('--widgets', type=int, default=500, help='number of registered widgets (default %(default)s)')
+    parser.add_argument('--rebuilds', type=int, default=100, help='number of times to rebuild a plugin frame (default %(default)s)')
+    parser.add_argument('--runs', type=int, default=5, help='number of runs, best is reported (default %(default)s)')
+    args = parser.parse_args()
+
+    if sys.platform == 'linux' and not os.environ.get('DISPLAY'):
+        sys.stderr.write('Needs a display\n')
+        return 1
+
+    from l10n import Translations
+    Translations.install_dummy()
+    from theme import theme
+
+    root = tk.Tk()
+    frame = tk.Frame(root)
+    frame.grid()
+    build(frame, args.widgets)
+    theme.register(frame)
+    theme.apply(root)	# first time sets up the window manager too
+
+    def all_widgets():
+        for widget in list(theme.widgets):
+            theme._update_widget(widget)
+
+    def unchanged():
+        theme.apply(root)
+
+    report = OrderedDict([
+        ('benchmark', 'theme'),
+        ('python', sys.version.split()[0]),
+        ('tk', root.tk.call('info', 'patchlevel')),
+        ('widgets', theme.registered()),
+        ('runs', args.runs),
+        ('update_all_ms', timed(all_widgets, args.runs)),
+        ('apply_unchanged_ms', timed(unchanged, args.runs)),
+    ])
+
+    # A plugin that rebuilds its frame, e.g. on every jump, shouldn't grow the registry
+    for i in range(args.rebuilds):
+        plugin = tk.Frame(frame)
+        build(plugin, 10)
+        theme.update(plugin)
+        plugin.destroy()
+    report['rebuilds'] = args.rebuilds
+    report['widgets_after_rebuilds'] = theme.registered()
+    root.destroy()
+
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
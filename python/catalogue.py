@@ -0,0 +1,109 @@
+#
+# Commodities from commodity.csv and rare_commodity.csv, for plugins.
+#
+# Loaded once, on first use, and indexed by id, by symbol, by lowercase name and symbol (as from EDLogs.canonicalise()
+# e.g. 'gold', 'eraninpearlwhisky', or as displayed e.g. 'eranin pearl whisky') and, for rares, by the market that
+# sells them. The parsed rows are kept in the cache folder and only read from the CSVs again when they change.
+#
+
+from collections import namedtuple, OrderedDict
+import csv
+import os
+from os.path import dirname, isdir, join
+import pickle
+import re
+from traceback import print_exc
+
+from config import config
+
+SOURCES = ['commodity.csv', 'rare_commodity.csv']
+
+Commodity = namedtuple('Commodity', ['id', 'symbol', 'category', 'name', 'market_id'])	# market_id is None unless rare
+
+_RE_CANONICALISE = re.compile(r'\$(.+)_name;')	# as EDLogs
+
+
+class Catalogue(object):
+
+    def __init__(self, rows):
+        self.commodities = [Commodity(*row) for row in rows]
+        self.by_id = {}
+        self.by_symbol = {}
+        self.by_name = {}
+        self.by_market = {}		# market_id -> [rare Commodity]
+        self.categories = OrderedDict()	# category -> [Commodity], in the order of the CSVs
+        for commodity in self.commodities:
+            self.by_id[commodity.id] = commodity
+            self.by_symbol[commodity.symbol] = commodity
+            self.by_name[commodity.name.lower()] = commodity
+            self.by_name[commodity.symbol.lower()] = commodity
+            if commodity.market_id:
+                self.by_market.setdefault(commodity.market_id, []).append(commodity)
+            self.categories.setdefault(commodity.category, []).append(commodity)
+
+    def __len__(self):
+        return len(self.commodities)
+
+    def lookup(self, item):
+        # Commodity by id, or by name in any of the forms in the journal, or None
+        if isinstance(item, int):
+            return self.by_id.get(item)
+        elif not item:
+            return None
+        item = item.lower()
+        match = _RE_CANONICALISE.match(item)
+        return self.by_name.get(match and match.group(1) or item)
+
+    def is_rare(self, item):
+        commodity = self.lookup(item)
+        return bool(commodity and commodity.market_id)
+
+    def rares(self, market_id):
+        return self.by_market.get(market_id, [])
+
+
+def read(paths):
+    # Rows as tuples - id, symbol, category, name, market_id
+    rows = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', newline='') as h:
+            for row in csv.DictReader(h):
+                rows.append((int(row['id']), row['symbol'], row['category'], row['name'], row.get('market_id') and int(row['market_id']) or None))
+    return rows
+
+
+def load(folder=None):
+    folder = folder or config.respath
+    paths = [join(folder, source) for source in SOURCES]
+    cache = join(config.cache_dir, 'commodities.pickle')
+    stamps = [(os.stat(path).st_mtime, os.stat(path).st_size) for path in paths]
+    try:
+        with open(cache, 'rb') as h:
+            cached = pickle.load(h)
+        if cached['stamps'] == stamps:
+            return Catalogue(cached['rows'])
+    except:
+        pass	# Missing, corrupt or from an incompatible version
+
+    rows = read(paths)
+    try:
+        if not isdir(dirname(cache)):
+            os.makedirs(dirname(cache))
+        with open(cache + '.tmp', 'wb') as h:
+            pickle.dump({ 'stamps': stamps, 'rows': rows }, h, pickle.HIGHEST_PROTOCOL)
+        os.replace(cache + '.tmp', cache)
+    except:
+        print_exc()
+    return Catalogue(rows)
+
+
+catalogue = None	# Loaded on first use
+
+def get():
+    global catalogue
+    if not catalogue:
+        catalogue = load()
+    return catalogue
+
+def lookup(item):
+    return get().lookup(item)
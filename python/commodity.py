@@ -0,0 +1,50 @@
+# Export market data in CSV format
+
+from os.path import join
+from time import localtime, strftime
+
+from config import config
+from market import items, timestamp
+
+COMMODITY_DEFAULT = 0
+COMMODITY_CSV     = 2
+
+bracketmap = { 0: '',
+               1: 'Low',
+               2: 'Med',
+               3: 'High', }
+
+
+def export(entry, kind=COMMODITY_DEFAULT, filename=None):
+    # entry is a Market journal entry with Items
+    querytime = timestamp(entry)
+
+    if not filename:
+        filename = join(config.get('outdir'), '%s.%s.%s.csv' % (entry['StarSystem'].strip(), entry['StationName'].strip(), strftime('%Y-%m-%dT%H.%M.%S', localtime(querytime))))
+
+    if kind == COMMODITY_CSV:
+        sep = ';'	# BUG: for fr locale
+        header = sep.join(['System','Station','Commodity','Sell','Buy','Demand','','Supply','','Date','\n'])
+    else:	# COMMODITY_DEFAULT
+        sep = ','
+        header = sep.join(['System','Station','Commodity','Sell','Buy','Demand','','Supply','','Average','FDevID','Date\n'])
+    rowheader = sep.join([entry['StarSystem'], entry['StationName']])
+
+    with open(filename, 'wt', encoding='utf-8') as h:
+        h.write(header)
+        for commodity in items(entry):
+            line = sep.join([
+                rowheader,
+                commodity['name'],
+                commodity['sellPrice'] and str(int(commodity['sellPrice'])) or '',
+                commodity['buyPrice'] and str(int(commodity['buyPrice'])) or '',
+                str(int(commodity['demand'])) if commodity['demandBracket'] else '',
+                bracketmap[commodity['demandBracket']],
+                str(int(commodity['stock'])) if commodity['stockBracket'] else '',
+                bracketmap[commodity['stockBracket']]
+            ])
+            if kind == COMMODITY_DEFAULT:
+                line = sep.join([line, str(int(commodity['meanPrice'])), str(commodity['id']), entry['timestamp'] + '\n'])
+            else:
+                line = sep.join([line, entry['timestamp'] + '\n'])
+            h.write(line)
@@ -1,5 +1,9 @@
 import numbers
+import os
 import sys
+import threading
+from time import monotonic
+from traceback import print_exc
 from os import getenv, makedirs, mkdir, pardir
 from os.path import expanduser, dirname, exists, isdir, join, normpath
 from sys import platform
@@ -107,7 +111,7 @@ class Config(object):
 
     if platform=='darwin':
 
-        def __init__(self):
+        def _open(self):
             self.app_dir = join(NSSearchPathForDirectoriesInDomains(NSApplicationSupportDirectory, NSUserDomainMask, True)[0], appname)
             if not isdir(self.app_dir):
                 mkdir(self.app_dir)
@@ -116,6 +120,10 @@ class Config(object):
             if not isdir(self.plugin_dir):
                 mkdir(self.plugin_dir)
 
+            self.cache_dir = join(self.app_dir, 'cache')	# Derived data that can be rebuilt if deleted
+            if not isdir(self.cache_dir):
+                mkdir(self.cache_dir)
+
             self.internal_plugin_dir = getattr(sys, 'frozen', False) and normpath(join(dirname(sys.executable), pardir, 'Library', 'plugins')) or join(dirname(__file__), 'plugins')
 
             self.default_journal_dir = join(NSSearchPathForDirectoriesInDomains(NSApplicationSupportDirectory, NSUserDomainMask, True)[0], 'Frontier Developments', 'Elite Dangerous')
@@ -137,7 +145,7 @@ class Config(object):
             if not self.get('outdir') or not isdir(self.get('outdir')):
                 self.set('outdir', NSSearchPathForDirectoriesInDomains(NSDocumentDirectory, NSUserDomainMask, True)[0])
 
-        def get(self, key):
+        def _get(self, key):
             val = self.settings.get(key)
             if val is None:
                 return None
@@ -148,29 +156,28 @@ class Config(object):
             else:
                 return None
 
-        def getint(self, key):
+        def _getint(self, key):
             try:
                 return int(self.settings.get(key, 0))	# should already be int, but check by casting
             except:
                 return 0
 
-        def set(self, key, val):
+        def _set(self, key, val):
             self.settings[key] = val
 
-        def delete(self, key):
+        def _delete(self, key):
             self.settings.pop(key, None)
 
-        def save(self):
+        def _save(self):
             self.defaults.setPersistentDomain_forName_(self.settings, self.identifier)
             self.defaults.synchronize()
 
-        def close(self):
-            self.save()
+        def _close(self):
             self.defaults = None
 
     elif platform=='win32':
 
-        def __init__(self):
+        def _open(self):
 
             self.app_dir = join(KnownFolderPath(FOLDERID_LocalAppData), appname)
             if not isdir(self.app_dir):
@@ -180,6 +187,10 @@ class Config(object):
             if not isdir(self.plugin_dir):
                 mkdir(self.plugin_dir)
 
+            self.cache_dir = join(self.app_dir, 'cache')	# Derived data that can be rebuilt if deleted
+            if not isdir(self.cache_dir):
+                mkdir(self.cache_dir)
+
             self.internal_plugin_dir = join(dirname(getattr(sys, 'frozen', False) and sys.executable or __file__), u'plugins')
 
             # expanduser in Python 2 on Windows doesn't handle non-ASCII - http://bugs.python.org/issue13207
@@ -210,7 +221,7 @@ class Config(object):
             if not self.get('outdir') or not isdir(self.get('outdir')):
                 self.set('outdir', KnownFolderPath(FOLDERID_Documents) or self.home)
 
-        def get(self, key):
+        def _get(self, key):
             typ  = DWORD()
             size = DWORD()
             if RegQueryValueEx(self.hkey, key, 0, ctypes.byref(typ), None, ctypes.byref(size)) or typ.value not in [REG_SZ, REG_MULTI_SZ]:
@@ -223,7 +234,7 @@ class Config(object):
             else:
                 return str(buf.value)
 
-        def getint(self, key):
+        def _getint(self, key):
             typ  = DWORD()
             size = DWORD(4)
             val  = DWORD()
@@ -232,7 +243,7 @@ class Config(object):
             else:
                 return val.value
 
-        def set(self, key, val):
+        def _set(self, key, val):
             if isinstance(val, str):
                 buf = ctypes.create_unicode_buffer(val)
                 RegSetValueEx(self.hkey, key, 0, REG_SZ, buf, len(buf)*2)
@@ -245,13 +256,13 @@ class Config(object):
             else:
                 raise NotImplementedError()
 
-        def delete(self, key):
+        def _delete(self, key):
             RegDeleteValue(self.hkey, key)
 
-        def save(self):
+        def _save(self):
             pass	# Redundant since registry keys are written immediately
 
-        def close(self):
+        def _close(self):
             RegCloseKey(self.hkey)
             self.hkey = None
 
@@ -259,7 +270,7 @@ class Config(object):
 
         SECTION = 'config'
 
-        def __init__(self):
+        def _open(self):
 
             # http://standards.freedesktop.org/basedir-spec/latest/ar01s03.html
             self.app_dir = join(getenv('XDG_DATA_HOME', expanduser('~/.local/share')), appname)
@@ -270,6 +281,10 @@ class Config(object):
             if not isdir(self.plugin_dir):
                 mkdir(self.plugin_dir)
 
+            self.cache_dir = join(self.app_dir, 'cache')	# Derived data that can be rebuilt if deleted
+            if not isdir(self.cache_dir):
+                mkdir(self.cache_dir)
+
             self.internal_plugin_dir = join(dirname(__file__), 'plugins')
 
             self.default_journal_dir = None
@@ -294,7 +309,7 @@ class Config(object):
             if not self.get('outdir') or not isdir(self.get('outdir')):
                 self.set('outdir', expanduser('~'))
 
-        def get(self, key):
+        def _get(self, key):
             try:
                 val = self.config.get(self.SECTION, key)
                 if u'\n' in val:	# list
@@ -306,13 +321,13 @@ class Config(object):
             except:
                 return None
 
-        def getint(self, key):
+        def _getint(self, key):
             try:
                 return self.config.getint(self.SECTION, key)
             except:
                 return 0
 
-        def set(self, key, val):
+        def _set(self, key, val):
             if isinstance(val, bool):
                 self.config.set(self.SECTION, key, val and '1' or '0')
             elif isinstance(val, str) or isinstance(val, numbers.Integral):
@@ -322,15 +337,16 @@ class Config(object):
             else:
                 raise NotImplementedError()
 
-        def delete(self, key):
+        def _delete(self, key):
             self.config.remove_option(self.SECTION, key)
 
-        def save(self):
-            with codecs.open(self.filename, 'w', 'utf-8') as h:
+        def _save(self):
+            # Write to a temporary file and rename so a crash can't leave a truncated file
+            with codecs.open(self.filename + '.tmp', 'w', 'utf-8') as h:
                 self.config.write(h)
+            os.replace(self.filename + '.tmp', self.filename)
 
-        def close(self):
-            self.save()
+        def _close(self):
             self.config = None
 
         def _escape(self, val):
@@ -349,11 +365,113 @@ class Config(object):
 
     else:	# ???
 
-        def __init__(self):
+        def _open(self):
             raise NotImplementedError('Implement me')
 
     # Common
 
+    # Settings are read through to the platform's _get/_getint once, then cached. Changes are written to the platform's
+    # store straight away but only saved to disk SAVE_DELAY seconds after the last change, by a single background
+    # thread, or on close. Changes after close are ignored.
+
+    SAVE_DELAY = 2
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.strings = {}	# get() results by key
+        self.ints = {}		# getint() results by key
+        self.subscribers = {}	# callbacks by key
+        self.dirty = False
+        self.closed = False
+        self.save_due = None	# monotonic() time to save at
+        self.changed = threading.Condition(self.lock)
+        self.saver = None	# thread that saves after SAVE_DELAY
+        self._open()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.strings:
+                val = self.strings[key]
+            else:
+                val = self.strings[key] = self._get(key)
+        return list(val) if isinstance(val, list) else val	# make writeable
+
+    def getint(self, key):
+        with self.lock:
+            if key in self.ints:
+                return self.ints[key]
+            val = self.ints[key] = self._getint(key)
+            return val
+
+    def set(self, key, val):
+        self._change(key, lambda: self._set(key, val))
+
+    def delete(self, key):
+        self._change(key, lambda: self._delete(key))
+
+    def _change(self, key, change):
+        with self.lock:
+            if self.closed:
+                return
+            subscribers = list(self.subscribers.get(key, []))
+            if subscribers:
+                before = (self.get(key), self.getint(key))
+            change()
+            self.strings.pop(key, None)	# re-read from the platform, which knows how to convert
+            self.ints.pop(key, None)
+            self.dirty = True
+            self.save_due = monotonic() + self.SAVE_DELAY
+            if not self.saver:
+                self.saver = threading.Thread(target=self.save_later, name='Config saver')
+                self.saver.daemon = True
+                self.saver.start()
+            self.changed.notify()
+            changed = subscribers and (self.get(key), self.getint(key)) != before
+        if changed:
+            for callback in subscribers:
+                try:
+                    callback(key)
+                except:
+                    print_exc()
+
+    # Call callback(key) after key is set to a different value or deleted. Called on the thread that changed it.
+    def subscribe(self, key, callback):
+        with self.lock:
+            self.subscribers.setdefault(key, []).append(callback)
+
+    def unsubscribe(self, key, callback):
+        with self.lock:
+            if callback in self.subscribers.get(key, []):
+                self.subscribers[key].remove(callback)
+
+    def save(self):
+        with self.lock:
+            if self.dirty and not self.closed:
+                self._save()
+                self.dirty = False
+
+    def save_later(self):
+        # On the saver thread
+        with self.lock:
+            while not self.closed:
+                if not self.dirty:
+                    self.changed.wait()
+                elif self.save_due > monotonic():
+                    self.changed.wait(self.save_due - monotonic())
+                else:
+                    try:
+                        self.save()
+                    except:
+                        print_exc()
+                        self.dirty = False	# don't retry until the next change
+
+    def close(self):
+        self.save()
+        with self.lock:
+            self.closed = True
+            self.changed.notify()
+            self._close()
+
     def get_password(self, account):
         try:
             import keyring
@@ -1,41 +1,51 @@
 #!/usr/bin/env python3
 # requires pip install watchdog
 
-import os
 import sys
 import time
-import logging
 import re
 
-from os.path import dirname, expanduser, isdir, join
+from os.path import dirname, expanduser, join
 from time import gmtime, time, localtime, strftime, strptime
 from sys import platform
 from theme import theme
 from ttkHyperlinkLabel import openurl
 
 import tkinter as tk
-import tkinter.filedialog as tkfiledialog
 import tkinter.font
-import tkinter.messagebox
 import plug
 
 from config import appname, applongname, appversion, config
 from l10n import Translations
 
 from monitor import monitor
+import harnessdll
+import latency
 from ttkHyperlinkLabel import HyperlinkLabel
 
-import prefs
+# prefs, companion, tkinter.messagebox etc are only needed once the user clicks on something, so are imported
+# where used to get the main window up sooner. Use "py -m bench.startup" to check what's imported at startup.
+# Similarly market, commodity and td are only imported when a market is exported.
 
-import companion
+def crewroletext(role):
+    # Return translated crew role. Needs to be dynamic to allow for changing language.
+    return {
+        None: '',
+        'Idle': '',
+        'FighterCon': _('Fighter'),	# Multicrew role
+        'FireCon':    _('Gunner'),	# Multicrew role
+        'Helm':       _('Helm'),	# Multicrew role
+    }.get(role, role)
 
-#import commodity
-#import td
 
 class Application(object):
 
+    REFRESH_INTERVAL = 16	# ms. Display updates from the journal are applied at most this often
+
     def __init__(self, master=None):
         self.w = master
+        self.displayed = {}		# (widget, option) -> value, so unchanged fields aren't sent to Tk
+        self.refresh_alarm = None	# pending updatedetails
         self.w.title(appname)
         self.w.rowconfigure(0, weight=1)
         self.w.columnconfigure(0, weight=1)
@@ -94,7 +104,7 @@ class Application(object):
         self.menubar = tk.Menu()
         self.file_menu = tk.Menu(self.menubar, tearoff=tk.FALSE)
 
-        self.file_menu.add_command(command=lambda:prefs.PreferencesDialog(self.w, self.postprefs))
+        self.file_menu.add_command(command=self.settings)
         self.menubar.add_cascade(menu=self.file_menu)
         self.file_menu.add_separator()
         self.file_menu.add_command(command=self.onexit)
@@ -105,6 +115,7 @@ class Application(object):
 
         self.help_menu = tk.Menu(self.menubar, tearoff=tk.FALSE)
         self.help_menu.add_command(command=self.help_about)
+        self.help_menu.add_command(command=lambda:latency.LatencyDialog(self.w))
         self.menubar.add_cascade(menu=self.help_menu)
 
         theme.register(self.menubar)	# menus and children aren't automatically registered
@@ -183,6 +194,8 @@ class Application(object):
 
         self.w.bind_all('<<JournalEvent>>', self.journal_event)	# Journal monitoring callback
         self.w.bind_all('<<PluginError>>', self.plugin_error)	# Statusbar
+        self.w.bind_all('<<HarnessInstalled>>', self.harness_installed)	# Statusbar
+        self.w.bind_all('<<MarketExportFailed>>', self.market_export_failed)	# Statusbar
         self.w.bind_all('<<Quit>>', self.onexit)		# Updater
         self.w.protocol("WM_DELETE_WINDOW", self.onexit)
         self.w.bind('<Control-c>', self.copy)
@@ -197,8 +210,8 @@ class Application(object):
 
     def set_labels(self):
         self.cmdr_label['text']    = _('Cmdr') + ':'	# Main window
-        self.ship_label['text']    = (monitor.state['Captain'] and _('Role') or	# Multicrew role label in main window
-                                      _('Ship')) + ':'	# Main window
+        self.setfield(self.ship_label, 'text', (monitor.state['Captain'] and _('Role') or	# Multicrew role label in main window
+                                                _('Ship')) + ':')	# Main window
         self.system_label['text']  = _('System') + ':'	# Main window
         self.station_label['text'] = _('Station') + ':'	# Main window
 
@@ -217,67 +230,92 @@ class Application(object):
         self.file_menu.entryconfigure(2, label=_('Exit'))	# Item in the File menu on Windows
 
         self.help_menu.entryconfigure(0, label=_('About'))	# Help menu item
+        self.help_menu.entryconfigure(1, label=_('Latency'))	# Help menu item
 
     def journal_event(self, event):         # called by event <<JournalEvent>> by monitor when it places an event in the queue
         while True:
             entry = monitor.get_entry()
             if not entry:
                 return
-            print(f'JE {entry}')
-            #print(f'..Monitor state {monitor.state}')
-
-            if entry['event'] == 'ExitProgram':
-                self.onexit()
-                return
-
-            self.updatedetails()
-
-            if not entry['event'] or not monitor.mode:
-                return	# Startup or in CQC
-
-            # Export loadout
-            if entry['event'] == 'Loadout' and not monitor.state['Captain'] and config.getint('output') & config.OUT_SHIP:
-                monitor.export_ship()
-
-            if entry['event'] == 'Market'  and not monitor.state['Captain']:
-                lastmarket = entry
-
-            if entry['event'] == 'Harness-NewVersion':
-                self.newversion_button['text'] = '!! New version Available:' + entry['Version']
-                self.newversion_button.grid()
-                #self.status['text'] = 'New version'
-
-            # Plugins
-            err = plug.notify_journal_entry(monitor.cmdr, monitor.is_beta, monitor.system, monitor.station, entry, monitor.state)
-            if err:
-                self.status['text'] = err
-
+            try:
+                print(f'JE {entry}')
+                #print(f'..Monitor state {monitor.state}')
+
+                if entry['event'] == 'ExitProgram':
+                    self.onexit()
+                    return
+
+                self.schedule_refresh()
+
+                if not entry['event'] or not monitor.mode:
+                    return	# Startup or in CQC
+
+                # Export loadout
+                if entry['event'] == 'Loadout' and not monitor.state['Captain'] and config.getint('output') & config.OUT_SHIP:
+                    monitor.export_ship()
+
+                if entry['event'] == 'Market'  and not monitor.state['Captain']:
+                    self.lastmarket = entry
+                    self.export_market()
+
+                if entry['event'] == 'Harness-NewVersion':
+                    self.newversion_button['text'] = '!! New version Available:' + entry['Version']
+                    self.newversion_button.grid()
+                    #self.status['text'] = 'New version'
+
+                # Plugins
+                err = plug.notify_journal_entry(monitor.cmdr, monitor.is_beta, monitor.system, monitor.station, entry, monitor.state)
+                if err:
+                    self.status['text'] = err
+            finally:
+                latency.undispatched()
+
+
+    # Journal entries can arrive in bursts of thousands, so rather than updating the display for each one, note that
+    # it needs updating and do it once after REFRESH_INTERVAL, only touching the fields that have changed.
+    def schedule_refresh(self):
+        if self.refresh_alarm is None:
+            self.refresh_alarm = self.w.after(self.REFRESH_INTERVAL, self.updatedetails)
+
+    def setfield(self, widget, option, value):
+        if value is None:
+            return	# Tk ignores None, leaving the field as it was
+        key = (widget, option)
+        if key not in self.displayed or self.displayed[key] != value:
+            self.displayed[key] = value
+            widget[option] = value
 
     def updatedetails(self):
+        self.refresh_alarm = None
         if monitor.cmdr and monitor.state['Captain']:
-            self.cmdr['text'] = '%s / %s' % (monitor.cmdr, monitor.state['Captain'])
-            self.ship_label['text'] = _('Role') + ':'	# Multicrew role label in main window
-            self.ship.configure(state = tk.NORMAL, text = crewroletext(monitor.state['Role']), url = None)
+            self.setfield(self.cmdr, 'text', '%s / %s' % (monitor.cmdr, monitor.state['Captain']))
+            self.setfield(self.ship_label, 'text', _('Role') + ':')	# Multicrew role label in main window
+            self.setfield(self.ship, 'state', tk.NORMAL)
+            self.setfield(self.ship, 'text', crewroletext(monitor.state['Role']))
         elif monitor.cmdr:
             #print(f"Update details {monitor.system} {monitor.station}")
             if monitor.group:
-                self.cmdr['text'] = '%s / %s' % (monitor.cmdr, monitor.group)
+                self.setfield(self.cmdr, 'text', '%s / %s' % (monitor.cmdr, monitor.group))
             else:
-                self.cmdr['text'] = monitor.cmdr
-            self.ship_label['text'] = _('Ship') + ':'	# Main window
-            self.ship['text'] = monitor.state['ShipName']
-            self.system['text'] = monitor.system
-            if monitor.station is None:
-                self.station['text'] = ''
-            else:
-                self.station['text'] = monitor.station
+                self.setfield(self.cmdr, 'text', monitor.cmdr)
+            self.setfield(self.ship_label, 'text', _('Ship') + ':')	# Main window
+            self.setfield(self.ship, 'text', monitor.state['ShipName'])
+            self.setfield(self.system, 'text', monitor.system)
+            self.setfield(self.station, 'text', monitor.station or '')
         else:
-            self.cmdr['text'] = ''
-            self.ship_label['text'] = _('Ship') + ':'	# Main window
-            self.ship['text'] = ''
+            self.setfield(self.cmdr, 'text', '')
+            self.setfield(self.ship_label, 'text', _('Ship') + ':')	# Main window
+            self.setfield(self.ship, 'text', '')
+
+        copy = monitor.system and tk.NORMAL or tk.DISABLED
+        if self.displayed.get('copy') != copy:
+            self.displayed['copy'] = copy
+            self.edit_menu.entryconfigure(0, state=copy)	# Copy
 
-        self.edit_menu.entryconfigure(0, state=monitor.system and tk.NORMAL or tk.DISABLED)	# Copy
 
+    def settings(self, event=None):
+        import prefs
+        prefs.PreferencesDialog(self.w, self.postprefs)
 
     def onexit(self, event=None):
         print("on exit!")
@@ -285,7 +323,12 @@ class Application(object):
             print(f"Windows save geo {self.w.geometry()}")
             config.set('geometry', '+{1}+{2}'.format(*self.w.geometry().split('+')))
         self.w.withdraw()	# Following items can take a few seconds, so hide the main window while they happen
+        if self.refresh_alarm is not None:
+            self.w.after_cancel(self.refresh_alarm)
+            self.refresh_alarm = None
         monitor.close()
+        if 'market' in sys.modules:
+            sys.modules['market'].exporter.close()	# finish writing
         plug.notify_stop()
         config.close()
         self.w.destroy()
@@ -333,7 +376,8 @@ class Application(object):
 
 
     def help_about(self):
-        tk.messagebox.showinfo(
+        import tkinter.messagebox
+        tkinter.messagebox.showinfo(
             f'EDD-EDMC: {appversion}',
                 "This program supports EDMC plugins for EDD/EDDLite\r\n\r\n"
                 "Install this program, then run it, then close the program\r\n"
@@ -349,17 +393,27 @@ class Application(object):
             self.status['text'] = plug.last_error['msg']
             self.w.update_idletasks()
 
+    # Display result of installing the harness DLL
+    def harness_installed(self, event=None):
+        if harnessdll.last_result.get('msg'):
+            self.status['text'] = harnessdll.last_result['msg']
+
+    # Display asynchronous error from market export
+    def market_export_failed(self, event=None):
+        import market
+        if market.last_result.get('msg'):
+            self.status['text'] = market.last_result['msg']
+
     def getandsend(self,event = None):
-        # will be used if I bother to turn back on export
+        # will be used if I bother to turn back on the Update button
         print("*** get and send - not implememented yet, turn on button above**")
+        self.export_market()
 
-        if config.getint('output') & (config.OUT_MKT_CSV|config.OUT_MKT_TD):
-            if not lastmarket is None:
-                print("Lastmarket set")
-                if config.getint('output') & config.OUT_MKT_CSV:    # would need to fix the exporters
-                    commodity.export(lastmarket, COMMODITY_CSV)
-                if config.getint('output') & config.OUT_MKT_TD:
-                    td.export(lastmarket)
+    def export_market(self):
+        # In the background, and only if the market has changed since it was last exported
+        if self.lastmarket and config.getint('output') & (config.OUT_MKT_CSV|config.OUT_MKT_TD):
+            import market
+            market.exporter.export(self.lastmarket, config.getint('output'), self.w)
 
 
 
@@ -383,46 +437,9 @@ if __name__ == "__main__":
 
     root = tk.Tk()
 
-    # NEW! make sure EDDLite and EDDiscovery has the interface DLL
-
-    import shutil
-
-    source = join(os.getcwd(),"EDMCHarness.dll")
-
-    if os.path.exists(source):
-        dllfolder = os.path.abspath(join(config.app_dir,'..\EDDLite\DLL'))
-        dllfolder2 = os.path.abspath(join(config.app_dir,'..\EDDiscovery\DLL'))
-
-        if not isdir(dllfolder):
-            os.makedirs(dllfolder)
-
-        if not isdir(dllfolder2):
-            os.makedirs(dllfolder2)
-
-        dest = join(dllfolder,"EDMCHarness.dll")
-        dest2 = join(dllfolder2,"EDMCHarness.dll")
-
-        print(f"DLL folder {source} to {dest}")
-        try:
-            shutil.copyfile(source,dest)
-        except:
-            e = sys.exc_info()[0]
-            print(f"Cannot copy DLL {e} - it may be in use")
-
-        print(f"DLL folder {source} to {dest2}")
-        try:
-            shutil.copyfile(source,dest2)
-        except:
-            e = sys.exc_info()[0]
-            print(f"Cannot copy DLL {e} - it may be in use")
-
-        if not os.path.exists(dest):
-            print(f"{dest} not installed!")
-        if not os.path.exists(dest2):
-            print(f"{dest2} not installed!")
+    app = Application(root)
 
-    else:
-        print("Harness DLL not present")
+    # make sure EDDLite and EDDiscovery has the interface DLL. Done in the background so as not to delay startup.
+    harnessdll.install_async(root)
 
-    app = Application(root)
     root.mainloop()
@@ -0,0 +1,111 @@
+#
+# Install EDMCHarness.dll into the EDDLite and EDDiscovery DLL folders.
+#
+# Runs in a background thread so it doesn't hold up the main window, and only copies when the installed DLL differs
+# from ours. Copies go via a temporary file in the destination folder so a half-written DLL is never left behind.
+#
+
+import hashlib
+import os
+from os.path import exists, getmtime, getsize, isdir, join, pardir
+import shutil
+import threading
+from traceback import print_exc
+
+from config import config
+
+DLLNAME = 'EDMCHarness.dll'
+
+# Result of the last install, for display on the status line
+last_result = {
+    'msg': None,
+}
+
+
+def destinations():
+    return [
+        os.path.abspath(join(config.app_dir, pardir, 'EDDLite', 'DLL', DLLNAME)),
+        os.path.abspath(join(config.app_dir, pardir, 'EDDiscovery', 'DLL', DLLNAME)),
+    ]
+
+
+def filehash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+def uptodate(source, dest):
+    # Cheap checks first - a DLL we installed has the same size and mtime as the source
+    if not exists(dest) or getsize(dest) != getsize(source):
+        return False
+    elif getmtime(dest) == getmtime(source):
+        return True
+    else:
+        return filehash(dest) == filehash(source)
+
+
+def install(source, dest):
+    # Returns True if copied, False if already up to date. Raises on error.
+    if uptodate(source, dest):
+        return False
+
+    folder = os.path.dirname(dest)
+    if not isdir(folder):
+        os.makedirs(folder)
+
+    temp = dest + '.tmp'
+    try:
+        shutil.copyfile(source, temp)
+        shutil.copystat(source, temp)	# keep mtime so the next check is cheap
+        os.replace(temp, dest)	# fails if EDD has the DLL loaded
+    finally:
+        if exists(temp):
+            os.remove(temp)
+    return True
+
+
+def install_all(source):
+    installed = 0
+    failed = 0
+    for dest in destinations():
+        try:
+            if install(source, dest):
+                print(f"DLL installed {source} to {dest}")
+                installed += 1
+            else:
+                print(f"DLL {dest} up to date")
+        except:
+            print(f"Cannot copy DLL to {dest} - it may be in use")
+            print_exc()
+            failed += 1
+
+    if failed:
+        return 'Harness DLL not installed - close EDD/EDDLite and restart'
+    elif installed:
+        return 'Harness DLL installed'
+    else:
+        return None	# Nothing to report
+
+
+def install_async(root, source=None):
+    """
+    Install the harness DLL in a background thread.
+    Generates <<HarnessInstalled>> on root when done, with the message in last_result['msg'].
+    """
+    source = source or join(os.getcwd(), DLLNAME)
+    if not exists(source):
+        print("Harness DLL not present")
+        return None
+
+    def worker():
+        last_result['msg'] = install_all(source)
+        if last_result['msg']:
+            root.event_generate('<<HarnessInstalled>>', when="tail")
+
+    thread = threading.Thread(target=worker, name='Harness DLL installer')
+    thread.daemon = True
+    thread.start()
+    return thread
@@ -0,0 +1,180 @@
+#
+# Optional record of EDLogs.state and the location over time, so that plugins can ask what they were at an earlier
+# time with monitor.state_at() rather than replaying the journal themselves.
+#
+# Only what changed with each journal entry is recorded, with a full copy every KEYFRAME_INTERVAL changes. So a query
+# is a binary search for the last full copy before the time, and then at most KEYFRAME_INTERVAL changes to apply.
+# History older than the retention window before the latest entry is discarded a block at a time.
+#
+# Journal timestamps are ISO 8601 UTC, so they are kept and compared as strings.
+#
+
+from bisect import bisect_right
+from calendar import timegm
+import threading
+from time import gmtime, strftime, strptime
+
+from config import config
+from inventory import Inventory
+
+KEYFRAME_INTERVAL = 64		# changes between full copies
+RETENTION = 7 * 24 * 60 * 60	# seconds, unless set in config 'history_retention'
+
+# Attributes of EDLogs that are recorded along with state
+ATTRIBUTES = ['cmdr', 'is_beta', 'mode', 'group', 'planet', 'system', 'station', 'station_marketid', 'stationtype', 'coordinates', 'systemaddress']
+
+# Keys of state that parse_entry changes in place, and how to copy them. Other values are replaced, not changed.
+# Inventories record what changed in their counts, and Modules is copied when monitor.loadout_serial changes.
+COPIED = {
+    'Rank'      : dict,
+    'Engineers' : dict,
+    'Friends'   : frozenset,
+    'Modules'   : lambda modules: modules and dict(modules),	# module dicts are replaced, not changed
+}
+
+MISSING = object()
+
+
+def timestamp(when):
+    # In journal format, from a journal timestamp or seconds since the epoch
+    return when if isinstance(when, str) else strftime('%Y-%m-%dT%H:%M:%SZ', gmtime(when))
+
+
+class Counts(dict):
+    # Changes to an Inventory's counts, rather than the whole of it
+    __slots__ = ()
+
+
+class Block(object):
+    # A full copy of the fields, and the changes after it
+
+    __slots__ = ('start', 'keyframe', 'times', 'deltas')
+
+    def __init__(self, start, keyframe):
+        self.start = start
+        self.keyframe = keyframe
+        self.times = []
+        self.deltas = []
+
+    def latest(self):
+        return self.times and self.times[-1] or self.start
+
+
+class StateHistory(object):
+
+    def __init__(self, retention=None, interval=KEYFRAME_INTERVAL):
+        self.retention = retention or config.getint('history_retention') or RETENTION
+        self.interval = interval
+        self.blocks = []
+        self.starts = []		# start of each block, for bisecting
+        self.fields = {}		# field -> value as last recorded. Inventories are the monitor's own
+        self.loadout_serial = None	# monitor.loadout_serial when Modules was last recorded
+        self.restart = True		# start a new block with the next change
+        self.lock = threading.Lock()	# entries can be parsed on the monitor's thread
+
+    def changes(self, monitor):
+        # Fields that have changed since they were last recorded
+        fields = self.fields
+        delta = {}
+        for name in ATTRIBUTES:
+            value = getattr(monitor, name)
+            if value != fields.get(name, MISSING):
+                delta[name] = fields[name] = value
+        for (name, value) in monitor.state.items():
+            last = fields.get(name, MISSING)
+            if type(value) is Inventory:
+                if value is last:
+                    if value.delta:
+                        delta[name] = Counts(value.delta)
+                else:
+                    fields[name] = value
+                    delta[name] = value.snapshot()
+                continue
+            elif name == 'Modules':
+                if monitor.loadout_serial == self.loadout_serial and last is not MISSING:
+                    continue
+                self.loadout_serial = monitor.loadout_serial
+                value = COPIED[name](value)
+            elif name in COPIED:
+                if value == last:
+                    continue
+                value = COPIED[name](value)
+            elif value is last or value == last:
+                continue
+            delta[name] = fields[name] = value
+        return delta
+
+    def record(self, when, monitor):
+        # Called after each journal entry is parsed
+        delta = self.changes(monitor)
+        if not delta:
+            return
+        with self.lock:
+            if self.blocks and when < self.blocks[-1].latest():
+                self.truncate(when)	# journal replayed from earlier
+            if self.restart or len(self.blocks[-1].times) >= self.interval:
+                self.blocks.append(Block(when, { name: value.snapshot() if type(value) is Inventory else value for (name, value) in self.fields.items() }))
+                self.starts.append(when)
+                self.restart = False
+                self.expire(when)
+            else:
+                block = self.blocks[-1]
+                block.times.append(when)
+                block.deltas.append(delta)
+
+    def truncate(self, when):
+        # Forget anything after when
+        i = bisect_right(self.starts, when)
+        del self.blocks[i:]
+        del self.starts[i:]
+        if self.blocks:
+            block = self.blocks[-1]
+            j = bisect_right(block.times, when)
+            del block.times[j:]
+            del block.deltas[j:]
+        self.restart = True	# the next change is relative to fields, which are now after when
+
+    def expire(self, latest):
+        # Forget blocks that end before the retention window
+        try:
+            cutoff = timestamp(timegm(strptime(latest, '%Y-%m-%dT%H:%M:%SZ')) - self.retention)
+        except ValueError:
+            return
+        i = bisect_right(self.starts, cutoff) - 1	# the block that the window starts in
+        if i > 0:
+            del self.blocks[:i]
+            del self.starts[:i]
+
+    def at(self, when):
+        """
+        Fields as they were at a time.
+        :param when: journal timestamp, or seconds since the epoch
+        :return: dict of field -> value, or None if when is before the retained history. Inventories are read-only
+        dicts with an empty delta
+        """
+        when = timestamp(when)
+        with self.lock:
+            i = bisect_right(self.starts, when) - 1
+            if i < 0:
+                return None
+            block = self.blocks[i]
+            fields = dict(block.keyframe)
+            inventories = {}	# name -> Inventory with changes applied
+            for delta in block.deltas[:bisect_right(block.times, when)]:
+                for (name, value) in delta.items():
+                    if type(value) is Counts:
+                        inventory = inventories.get(name)
+                        if inventory is None:
+                            inventory = inventories[name] = fields[name].copy()
+                        for (item, change) in value.items():
+                            inventory.add(item, change)
+                    else:
+                        fields[name] = value
+                        inventories.pop(name, None)
+        for (name, value) in fields.items():
+            if type(value) is Inventory and name not in inventories:
+                fields[name] = value.as_dict()	# as plugins are given them
+        for (name, inventory) in inventories.items():
+            inventory.begin()	# delta is the changes applied, not the changes at when
+            fields[name] = inventory.as_dict()
+        return fields
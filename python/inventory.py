@@ -0,0 +1,212 @@
+#
+# Counts of cargo and materials, for EDLogs.state['Cargo'], ['Raw'], ['Manufactured'] and ['Encoded'].
+#
+# Behaves like the defaultdict(int) that it replaces - keyed by canonical name, 0 for anything not held, and only
+# holding names with a count above 0 - but names are mapped to small integers shared by all inventories, and the
+# counts are kept in an array indexed by them.
+#
+# snapshot() is O(1). The snapshot shares the array until the inventory next changes, and then the inventory copies
+# it. Each inventory also records, as delta, how each count changed with the last journal entry.
+#
+# Plugins are given as_dict() instead - a read-only dict, so that json.dumps and isinstance(..., dict) work as they
+# did with the defaultdict. It is made again only when the inventory changes.
+#
+
+from array import array
+from collections import defaultdict
+from collections.abc import ItemsView, MutableMapping, ValuesView
+import threading
+
+
+class Registry(object):
+    # Names to ids. Ids are given out on first sight, since commodity ids are sparse and materials don't have any
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.lock = threading.Lock()
+
+    def id(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            with self.lock:	# entries can be parsed on the monitor's thread
+                i = self.ids.get(name)
+                if i is None:
+                    i = self.ids[name] = len(self.names)
+                    self.names.append(name)
+        return i
+
+
+registry = Registry()
+
+
+class InventoryDict(dict):
+    # Read-only name -> count, with delta. 0 for anything not held, like the defaultdict(int) that Inventory replaces
+
+    def __init__(self, items, delta):
+        dict.__init__(self, items)
+        self.delta = delta
+
+    def __missing__(self, name):
+        return 0
+
+    def readonly(self, *args, **kwargs):
+        raise TypeError('Inventories passed to plugins are read-only')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = readonly
+
+    # Copies are changeable, as copies of the defaultdict were. Counts are ints, so a deep copy is the same
+
+    def __copy__(self):
+        return defaultdict(int, self)
+
+    def __deepcopy__(self, memo):
+        return defaultdict(int, self)
+
+    def __reduce__(self):
+        # Rather than pickle's default of setting each item
+        return (InventoryDict, (dict(self), dict(self.delta)))
+
+
+class InventoryItemsView(ItemsView):
+
+    def __iter__(self):
+        names = registry.names
+        return ((names[i], count) for (i, count) in enumerate(self._mapping.counts) if count > 0)
+
+
+class InventoryValuesView(ValuesView):
+
+    def __iter__(self):
+        return (count for count in self._mapping.counts if count > 0)
+
+
+class Inventory(MutableMapping):
+
+    __slots__ = ('counts', 'held', 'shared', 'frozen', 'delta', 'last', 'mapping')
+
+    def __init__(self, items=()):
+        self.counts = array('l')
+        self.held = 0		# number of names with count > 0
+        self.shared = False	# counts is shared with a snapshot
+        self.frozen = False	# this is a snapshot
+        self.delta = {}		# name -> change with the last journal entry
+        self.last = None	# snapshot, if nothing has changed since it was taken
+        self.mapping = None	# as_dict(), likewise
+        for (name, count) in items:
+            self.add(name, count)
+
+    def __getitem__(self, name):
+        i = registry.ids.get(name)
+        return self.counts[i] if i is not None and i < len(self.counts) else 0
+
+    def __contains__(self, name):
+        return self[name] > 0
+
+    def get(self, name, default=None):
+        return self[name] or default
+
+    def __setitem__(self, name, count):
+        self.set(registry.id(name), max(count, 0))
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self.set(registry.ids[name], 0)
+
+    def __iter__(self):
+        names = registry.names
+        return (names[i] for (i, count) in enumerate(self.counts) if count > 0)
+
+    # Views that iterate the array rather than going through __getitem__
+
+    def values(self):
+        return InventoryValuesView(self)
+
+    def items(self):
+        return InventoryItemsView(self)
+
+    def __len__(self):
+        return self.held
+
+    def __repr__(self):
+        return 'Inventory(%r)' % dict(self.items())
+
+    def set(self, i, count):
+        if self.frozen:
+            raise TypeError('Inventory snapshots are read-only')
+        self.last = self.mapping = None
+        if self.shared:
+            self.counts = array(self.counts.typecode, self.counts)	# copy on write
+            self.shared = False
+        if i >= len(self.counts):
+            self.counts.extend([0] * (i + 1 - len(self.counts)))
+        old = self.counts[i]
+        if count == old:
+            return
+        self.counts[i] = count
+        self.held += (count > 0) - (old > 0)
+        name = registry.names[i]
+        change = self.delta.get(name, 0) + count - old
+        if change:
+            self.delta[name] = change
+        else:
+            self.delta.pop(name)
+
+    def add(self, name, count=1):
+        i = registry.id(name)
+        self.set(i, max(self[name] + count, 0))
+
+    def remove(self, name, count=1):
+        # Counts don't go below 0
+        self.add(name, -count)
+
+    def replace(self, items):
+        # Set the contents to items, a sequence of (name, count). Counts for the same name are added together
+        counts = {}
+        for (name, count) in items:
+            counts[name] = counts.get(name, 0) + count
+        for name in list(self):
+            if name not in counts:
+                self.set(registry.ids[name], 0)
+        for (name, count) in counts.items():
+            self[name] = count
+
+    def total(self):
+        return sum(self.counts)
+
+    def begin(self):
+        # Called before each journal entry is parsed, so that delta is only that entry's changes
+        if self.delta:
+            self.delta = {}
+            self.last = self.mapping = None
+
+    def as_dict(self):
+        # A read-only dict as of now
+        if self.mapping is None:
+            self.mapping = InventoryDict(self.items(), dict(self.delta))
+        return self.mapping
+
+    def copy(self):
+        # A changeable copy. Shares counts until either changes
+        inventory = Inventory()
+        inventory.counts = self.counts
+        inventory.held = self.held
+        inventory.shared = True
+        if not self.frozen:
+            self.shared = True
+        return inventory
+
+    def snapshot(self):
+        # A read-only copy of the counts as of now, without delta. Most journal entries don't touch cargo or materials,
+        # so this is usually the last one
+        if self.frozen:
+            return self
+        if self.last is not None:
+            return self.last
+        snapshot = self.last = Inventory()
+        snapshot.counts = self.counts
+        snapshot.held = self.held
+        snapshot.frozen = True
+        self.shared = True
+        return snapshot
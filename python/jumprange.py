@@ -0,0 +1,206 @@
+#
+# Ship mass and jump range from the current loadout, for plugins.
+#
+# modules.p is loaded once into columns with a row per module, so that a loadout is summed with one index and sum per
+# column rather than a dict lookup per module. Uses numpy if it's installed.
+#
+# A Loadout summarises the fitted modules and is cached by its contents, so swapping back to a ship doesn't redo it.
+# The monitor counts changes to the modules and cargo, so current() only looks at the modules again after a Loadout,
+# ModuleBuy, ModuleSell, ModuleSwap etc, and only recounts the cargo after it has changed.
+#
+#   range = optmass / mass * (fuel / fuelmul) ^ (1 / fuelpower) + jumpboost
+#
+
+from array import array
+from collections import OrderedDict
+from os.path import join
+import pickle
+import re
+
+try:
+    import numpy
+except ImportError:
+    numpy = None	# Use arrays and loops instead
+
+from companion import ship_map
+from config import config
+from monitor import monitor
+
+COLUMNS = ['mass', 'optmass', 'maxfuel', 'fuelmul', 'fuelpower', 'jumpboost']
+MODIFIERS = { 'Mass': 'mass', 'FSDOptimalMass': 'optmass', 'MaxFuelPerJump': 'maxfuel' }	# Engineering modifiers that matter
+CACHE_SIZE = 32	# Loadouts
+
+_RE_CAPACITY = re.compile(r'int_(fueltank|cargorack|corrosionproofcargorack)_size(\d)_')
+
+
+class Loadout(object):
+    # Masses in tons, ranges in Ly
+
+    __slots__ = ('ship', 'hull', 'modules', 'fuel_capacity', 'cargo_capacity', 'optmass', 'maxfuel', 'fuelmul', 'fuelpower', 'jumpboost')
+
+    @property
+    def unladen(self):
+        return self.hull + self.modules
+
+    def mass(self, fuel=None, cargo=0):
+        return self.unladen + (self.fuel_capacity if fuel is None else fuel) + cargo
+
+    def range(self, fuel=None, cargo=0):
+        # Range of the next jump with fuel in the tanks (default full) and cargo in the hold
+        if not self.optmass:
+            return 0.0	# No FSD
+        fuel = self.fuel_capacity if fuel is None else fuel
+        return self.optmass / (self.unladen + fuel + cargo) * (min(fuel, self.maxfuel) / self.fuelmul) ** (1 / self.fuelpower) + self.jumpboost
+
+    def ranges(self, fuel, cargo):
+        # Range for each of a sequence of fuel and cargo levels e.g. along a route. Returns a numpy array if available
+        if not numpy:
+            return [self.range(f, c) for (f, c) in zip(fuel, cargo)]
+        fuel = numpy.asarray(fuel, dtype=float)
+        cargo = numpy.asarray(cargo, dtype=float)
+        if not self.optmass:
+            return numpy.zeros(numpy.broadcast(fuel, cargo).shape)
+        return self.optmass / (self.unladen + fuel + cargo) * (numpy.minimum(fuel, self.maxfuel) / self.fuelmul) ** (1 / self.fuelpower) + self.jumpboost
+
+
+class ModuleTable(object):
+
+    def __init__(self, modules, ships):
+        self.names = list(modules)
+        self.index = { name: i for i, name in enumerate(self.names) }
+        self.hulls = { ship: ships[name]['hullMass'] for (ship, name) in ship_map.items() if name in ships }
+
+        # Capacities aren't in modules.p, but follow from the size
+        fuelcapacity = []
+        cargocapacity = []
+        for name in self.names:
+            match = _RE_CAPACITY.match(name)
+            capacity = match and 2 ** int(match.group(2)) or 0
+            fuelcapacity.append(match and match.group(1) == 'fueltank' and capacity or 0)
+            cargocapacity.append(match and match.group(1) != 'fueltank' and capacity or 0)
+
+        for column in COLUMNS:
+            self.column(column, [modules[name].get(column, 0) for name in self.names])
+        self.column('fuelcapacity', fuelcapacity)
+        self.column('cargocapacity', cargocapacity)
+
+    def column(self, column, values):
+        setattr(self, column, numpy.array(values, dtype=float) if numpy else array('d', values))
+
+    def total(self, column, rows):
+        column = getattr(self, column)
+        return float(column[rows].sum()) if numpy else sum(column[i] for i in rows)
+
+    def loadout(self, ship, modules):
+        # modules as in monitor.state['Modules']. Unknown modules e.g. cockpit, paint jobs, are taken to weigh nothing
+        rows = []
+        engineered = []
+        for module in modules.values():
+            row = self.index.get(module['Item'])
+            if row is not None:
+                rows.append(row)
+                if module.get('Engineering'):
+                    engineered.append((row, module['Engineering'].get('Modifiers', [])))
+        if numpy:
+            rows = numpy.array(rows, dtype=int)
+
+        loadout = Loadout()
+        loadout.ship = ship
+        loadout.hull = self.hulls.get(ship, 0)
+        loadout.modules = self.total('mass', rows)
+        loadout.fuel_capacity = self.total('fuelcapacity', rows)
+        loadout.cargo_capacity = self.total('cargocapacity', rows)
+        loadout.jumpboost = self.total('jumpboost', rows)
+
+        # The FSD
+        fsd = None
+        for row in rows:
+            if self.optmass[row]:
+                fsd = int(row)
+                break
+        for column in ['optmass', 'maxfuel', 'fuelmul', 'fuelpower']:
+            setattr(loadout, column, float(getattr(self, column)[fsd]) if fsd is not None else 0.0)
+
+        for (row, modifiers) in engineered:
+            for modifier in modifiers:
+                column = MODIFIERS.get(modifier.get('Label'))
+                if column == 'mass':
+                    loadout.modules += modifier['Value'] - self.mass[row]
+                elif column and row == fsd:
+                    setattr(loadout, column, modifier['Value'])
+
+        return loadout
+
+
+def loadout_key(ship, modules):
+    # Everything that affects the Loadout
+    return (ship, tuple(sorted((slot, module['Item'], tuple((x.get('Label'), x.get('Value')) for x in module.get('Engineering', {}).get('Modifiers', [])))
+                               for (slot, module) in modules.items())))
+
+
+class JumpRange(object):
+
+    def __init__(self):
+        self.table = None	# Loaded on first use
+        self.loadouts = OrderedDict()	# by loadout_key, most recently used last
+        self.loadout_serial = None	# monitor.loadout_serial when self.current was found
+        self.current = None
+        self.cargo_serial = None	# monitor.cargo_serial when self.cargo was counted
+        self.cargo = 0
+
+    def load(self):
+        if not self.table:
+            with open(join(config.respath, 'modules.p'), 'rb') as h:
+                modules = pickle.load(h)
+            with open(join(config.respath, 'ships.p'), 'rb') as h:
+                ships = pickle.load(h)
+            self.table = ModuleTable(modules, ships)
+        return self.table
+
+    def loadout(self, ship, modules):
+        key = loadout_key(ship, modules)
+        loadout = self.loadouts.pop(key, None) or self.load().loadout(ship, modules)
+        self.loadouts[key] = loadout
+        if len(self.loadouts) > CACHE_SIZE:
+            self.loadouts.popitem(last=False)
+        return loadout
+
+    def current_loadout(self):
+        # Loadout of the current ship, or None if not known
+        if self.loadout_serial != monitor.loadout_serial:
+            self.loadout_serial = monitor.loadout_serial
+            self.current = monitor.state['Modules'] and self.loadout(monitor.state['ShipType'], monitor.state['Modules']) or None
+        return self.current
+
+    def current_cargo(self):
+        # Tons of cargo in the current ship
+        if self.cargo_serial != monitor.cargo_serial:
+            self.cargo_serial = monitor.cargo_serial
+            self.cargo = monitor.state['Cargo'].total()
+        return self.cargo
+
+
+# singleton
+engine = JumpRange()
+
+def current(fuel=None):
+    """
+    Mass and jump range of the current ship with its current cargo.
+    :param fuel: tons of fuel in the tanks, default full
+    :return: dict, or None if the loadout isn't known
+    """
+    loadout = engine.current_loadout()
+    if not loadout:
+        return None
+    cargo = engine.current_cargo()
+    return OrderedDict([
+        ('Ship', loadout.ship),
+        ('HullMass', loadout.hull),
+        ('UnladenMass', loadout.unladen),
+        ('FuelCapacity', loadout.fuel_capacity),
+        ('CargoCapacity', loadout.cargo_capacity),
+        ('Cargo', cargo),
+        ('Mass', loadout.mass(fuel, cargo)),
+        ('MaxJumpRange', loadout.range(min(loadout.maxfuel, loadout.fuel_capacity))),	# As in the Loadout event - empty, just enough fuel
+        ('JumpRange', loadout.range(fuel, cargo)),
+    ])
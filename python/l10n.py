@@ -5,9 +5,12 @@
 
 import codecs
 from collections import OrderedDict
+import hashlib
+import json
 import numbers
 import os
 from os.path import basename, dirname, exists, isfile, isdir, join, normpath
+import pickle
 import re
 import sys
 from sys import platform
@@ -58,11 +61,15 @@ class Translations(object):
 
 
     def __init__(self):
-        self.translations = { None: {} }
+        self.translations = { None: {} }	# Catalogs by plugin, None for the app
+        self.merged = { None: {} }	# Each plugin's catalog overlaid on the app's, so lookup doesn't need to fall back
+        self.translators = {}		# By context
+        self.missing = set()		# Strings already reported as missing
 
     def install_dummy(self):
         # For when translation is not desired or not available
         self.translations = { None: {} }
+        self.merge()
         builtins.__dict__['_'] = lambda x: str(x).replace(r'\"', u'"').replace(u'{CR}', u'\n')	# Promote strings to Unicode for consistency
 
     def install(self, lang=None):
@@ -85,17 +92,29 @@ class Translations(object):
         if lang not in self.available():
             self.install_dummy()
         else:
-            self.translations = { None: self.contents(lang) }
+            self.translations = { None: self.compiled(lang) }
             for plugin in os.listdir(config.plugin_dir):
                 plugin_path = join(config.plugin_dir, plugin, LOCALISATION_DIR)
                 if isdir(plugin_path):
                     try:
-                        self.translations[plugin] = self.contents(lang, plugin_path)
+                        self.translations[plugin] = self.compiled(lang, plugin_path, plugin)
                     except UnicodeDecodeError as e:
                         print('Malformed file %s.strings in plugin %s: %s' % (lang, plugin, e))
                     except:
                         print_exc()
-            builtins.__dict__['_'] = self.translate
+            self.merge()
+            builtins.__dict__['_'] = self.translator()
+
+    # Rebuild the merged catalogs in place, so translators already handed out pick up the new language
+    def merge(self):
+        app = self.translations[None]
+        for plugin in set(self.translations) | set(self.merged):
+            merged = self.merged.setdefault(plugin, {})
+            merged.clear()
+            merged.update(app)
+            if plugin:
+                merged.update(self.translations.get(plugin, {}))
+        self.missing.clear()
 
     def contents(self, lang, plugin_path=None):
         assert lang in self.available()
@@ -115,18 +134,72 @@ class Translations(object):
             translations[LANGUAGE_ID] = str(lang)	# Replace language name with code if missing
         return translations
 
-    def translate(self, x, context=None):
-        if context:
-            context = context[len(config.plugin_dir)+1:].split(os.sep)[0]
-            if __debug__:
-                if self.translations[None] and context not in self.translations:
-                    print('No translations for "%s"' % context)
-            return self.translations.get(context, {}).get(x) or self.translate(x)
+    # Same as contents, but from a pickled copy in the cache folder if the catalog hasn't changed since it was made.
+    # Checks modification time and size, then if those differ the SHA1 of the catalog, before parsing it again.
+    def compiled(self, lang, plugin_path=None, plugin=None):
+        source = self.filename(lang, plugin_path)
+        cache = join(config.cache_dir, 'strings', plugin and '%s.%s.pickle' % (plugin, lang) or '%s.pickle' % lang)
+        try:
+            st = os.stat(source)
+        except:
+            return self.contents(lang, plugin_path)	# let contents deal with it
+
+        cached = None
+        try:
+            with open(cache, 'rb') as h:
+                cached = pickle.load(h)
+            if cached['mtime'] == st.st_mtime and cached['size'] == st.st_size:
+                return cached['translations']
+        except:
+            cached = None	# Missing, corrupt or from an incompatible version
+
+        with open(source, 'rb') as h:
+            sha1 = hashlib.sha1(h.read()).hexdigest()
+        if cached and cached['sha1'] == sha1:
+            translations = cached['translations']	# touched but not changed
         else:
+            translations = self.contents(lang, plugin_path)
+
+        try:
+            if not isdir(dirname(cache)):
+                os.makedirs(dirname(cache))
+            with open(cache + '.tmp', 'wb') as h:
+                pickle.dump({ 'mtime': st.st_mtime, 'size': st.st_size, 'sha1': sha1, 'translations': translations }, h, pickle.HIGHEST_PROTOCOL)
+            os.replace(cache + '.tmp', cache)
+        except:
+            print_exc()
+        return translations
+
+    def translate(self, x, context=None):
+        return (self.translators.get(context) or self.translator(context))(x)
+
+    # Returns a function that translates strings for the plugin whose file is context, or for the app if None.
+    # Plugins can use this as their _ to avoid working out which plugin they are on every call.
+    def translator(self, context=None):
+        translator = self.translators.get(context)
+        if translator:
+            return translator
+
+        plugin = context and context[len(config.plugin_dir)+1:].split(os.sep)[0] or None
+        if __debug__:
+            if plugin and self.translations[None] and plugin not in self.translations:
+                print('No translations for "%s"' % plugin)
+        if plugin not in self.merged:
+            self.merged[plugin] = dict(self.merged[None])
+        strings = self.merged[plugin]
+
+        def translator(x):
+            translated = strings.get(x)
+            if translated:
+                return translated
             if __debug__:
-                if self.translations[None] and x not in self.translations[None]:
+                if self.translations[None] and x not in self.missing:
+                    self.missing.add(x)
                     print('Missing translation: "%s"' % x)
-            return self.translations[None].get(x) or str(x).replace(r'\"', u'"').replace(u'{CR}', u'\n')
+            return str(x).replace(r'\"', u'"').replace(u'{CR}', u'\n')
+
+        self.translators[context] = translator
+        return translator
 
     # Returns list of available language codes
     def available(self):
@@ -142,11 +215,44 @@ class Translations(object):
         names = OrderedDict([
             (None, _('Default')),	# Appearance theme and language setting
         ])
-        names.update(sorted([(lang, self.contents(lang).get(LANGUAGE_ID, lang)) for lang in self.available()] +
+        names.update(sorted(list(self.language_index().items()) +
                             [(Translations.FALLBACK, Translations.FALLBACK_NAME)],
                             key=lambda x: x[1]))	# Sort by name
         return names
 
+    # Language names by code. Reading a name means parsing the whole catalog, so names are kept in an index in the
+    # cache folder, and a catalog is only parsed if its modification time or size has changed.
+    def language_index(self):
+        path = join(config.cache_dir, 'languages.json')
+        try:
+            with open(path, 'rt', encoding='utf-8') as h:
+                index = json.load(h)
+        except:
+            index = {}	# Missing or corrupt
+
+        names = {}
+        changed = False
+        for lang in sorted(self.available()):
+            try:
+                st = os.stat(self.filename(lang))
+                key = [st.st_mtime, st.st_size]
+            except:
+                key = None
+            entry = index.get(lang)
+            if not entry or entry['key'] != key:
+                entry = index[lang] = { 'key': key, 'name': self.contents(lang).get(LANGUAGE_ID, lang) }
+                changed = True
+            names[lang] = entry['name']
+
+        if changed or len(index) != len(names):
+            try:
+                with open(path + '.tmp', 'wt', encoding='utf-8') as h:
+                    json.dump({ lang: index[lang] for lang in names }, h, ensure_ascii=False)
+                os.replace(path + '.tmp', path)	# so an interrupted write can't leave it truncated
+            except:
+                print_exc()
+        return names
+
     def respath(self):
         if getattr(sys, 'frozen', False):
             if platform=='darwin':
@@ -158,9 +264,17 @@ class Translations(object):
         else:
             return LOCALISATION_DIR
 
+    def filename(self, lang, plugin_path=None):
+        if plugin_path:
+            return join(plugin_path, '%s.strings' % lang)
+        elif getattr(sys, 'frozen', False) and platform=='darwin':
+            return join(self.respath(), '%s.lproj' % lang, 'Localizable.strings')
+        else:
+            return join(self.respath(), '%s.strings' % lang)
+
     def file(self, lang, plugin_path=None):
         if plugin_path:
-            f = join(plugin_path, '%s.strings' % lang)
+            f = self.filename(lang, plugin_path)
             if exists(f):
                 try:
                     return codecs.open(f, 'r', 'utf-8')
@@ -168,14 +282,82 @@ class Translations(object):
                     print_exc()
             return None
         elif getattr(sys, 'frozen', False) and platform=='darwin':
-            return codecs.open(join(self.respath(), '%s.lproj' % lang, 'Localizable.strings'), 'r', 'utf-16')
+            return codecs.open(self.filename(lang), 'r', 'utf-16')
         else:
-            return codecs.open(join(self.respath(), '%s.strings' % lang), 'r', 'utf-8')
+            return codecs.open(self.filename(lang), 'r', 'utf-8')
+
+
+class NumberFormatter(object):
+    # Formats and parses numbers like locale.format_string('%.*f', (decimals, number), True) and locale.atof, using
+    # the current locale's conventions as they were when it was created - see Locale.formatter.
+
+    def __init__(self, decimals):
+        conv = locale.localeconv()
+        self.point = conv['decimal_point']
+        self.separator = conv['thousands_sep']
+        self.grouping = conv['grouping']
+        self.spec = decimals and ',.%df' % decimals or ',d'
+
+        # Common case - groups of three - can be done by format() with its separators swapped for the locale's
+        intervals = []
+        for interval in self.intervals():
+            intervals.append(interval)
+            if len(intervals) > 20:
+                break
+        self.simple = not self.separator or intervals == [3] * 21
+        if not self.separator:
+            self.spec = self.spec[1:]	# no grouping
+        self.table = str.maketrans({ ',': self.separator, '.': self.point })
+
+        separator = self.separator and '(?:%s)?' % re.escape(self.separator) or ''
+        self.int_re = re.compile(r'\s*[+-]?\d+(?:%s\d+)*\s*$' % separator)
+        self.float_re = re.compile(r'\s*[+-]?(?:\d+(?:%s\d+)*(?:%s\d*)?|%s\d+)(?:[eE][+-]?\d+)?\s*$' %
+                                   (separator, re.escape(self.point), re.escape(self.point)))
+
+    def intervals(self):
+        # Like locale._grouping_intervals
+        last = None
+        for interval in self.grouping:
+            if interval == locale.CHAR_MAX:
+                return
+            elif interval == 0:
+                while last:
+                    yield last
+                return
+            yield interval
+            last = interval
+
+    def format(self, number):
+        if self.simple:
+            return format(number, self.spec).translate(self.table)
+
+        # Irregular grouping e.g. Indian 12,34,56,789
+        (sign, digits, fraction) = re.match(r'(-?)(\d+)(\.\d*)?$', format(number, self.spec.replace(',', ''))).groups()
+        groups = []
+        for interval in self.intervals():
+            if len(digits) <= interval:
+                break
+            groups.append(digits[-interval:])
+            digits = digits[:-interval]
+        groups.append(digits)
+        return sign + self.separator.join(reversed(groups)) + (fraction and self.point + fraction[1:] or '')
+
+    def parse(self, string):
+        # Returns None if the string is not parsable, otherwise an integer or float
+        if self.int_re.match(string):
+            return int(self.separator and string.replace(self.separator, '') or string)
+        elif self.float_re.match(string):
+            if self.separator:
+                string = string.replace(self.separator, '')
+            return float(string.replace(self.point, '.'))
+        else:
+            return None
 
 
 class Locale(object):
 
     def __init__(self):
+        self.formatters = {}	# by (decimals, locale)
         if platform=='darwin':
             self.int_formatter = NSNumberFormatter.alloc().init()
             self.int_formatter.setNumberStyle_(NSNumberFormatterDecimalStyle)
@@ -199,9 +381,23 @@ class Locale(object):
                 return self.float_formatter.stringFromNumber_(number)
         else:
             if not decimals and isinstance(number, numbers.Integral):
-                return locale.format('%d', number, True)
+                return self.formatter(0).format(number)
             else:
-                return locale.format('%.*f', (decimals or 5, number), True)
+                return self.formatter(decimals or 5).format(number)
+
+    def format_many(self, values, decimals=None):
+        # Same as stringFromNumber on each of values, but quicker for a column of a table
+        if platform == 'darwin':
+            return [self.stringFromNumber(value, decimals) for value in values]
+        integral = numbers.Integral
+        ints = self.formatter(0).format
+        if decimals == 0:
+            return [ints(value if isinstance(value, integral) else int(round(value))) for value in values]
+        floats = self.formatter(decimals or 5).format
+        if decimals:
+            return [floats(value) for value in values]
+        else:
+            return [ints(value) if isinstance(value, integral) else floats(value) for value in values]
 
     def numberFromString(self, string):
         # Uses the current system locale, irrespective of language choice.
@@ -209,13 +405,15 @@ class Locale(object):
         if platform=='darwin':
             return self.float_formatter.numberFromString_(string)
         else:
-            try:
-                return locale.atoi(string)
-            except:
-                try:
-                    return locale.atof(string)
-                except:
-                    return None
+            return self.formatter(0).parse(string)
+
+    # NumberFormatter for the current locale. The locale can be changed, so is part of the key.
+    def formatter(self, decimals):
+        key = (decimals, locale.setlocale(locale.LC_NUMERIC))
+        formatter = self.formatters.get(key)
+        if not formatter:
+            formatter = self.formatters[key] = NumberFormatter(decimals)
+        return formatter
 
     # Returns list of preferred language codes in RFC4646 format i.e. "lang[-script][-region]"
     # Where lang is a lowercase 2 alpha ISO 639-1 or 3 alpha ISO 639-2 code,
@@ -0,0 +1,236 @@
+#
+# Optional end to end latency tracing of journal entries, from the harness appending to stored/current.edd through to
+# each plugin's journal_entry.
+#
+# When enabled, the monitor queues each line with a Record of when it was detected and read, and times each stage:
+#   notify   - file modified to watchdog callback (from the file's mtime)
+#   read     - watchdog callback to line read in readfile
+#   queue    - line read to dequeued on the Tk thread in journal_event
+#   decode   - parse_entry
+#   plugin X - plugin X's journal_entry
+#   total    - file modified to all plugins called
+#
+# Viewed from Help > Latency, which can also turn tracing on and off and export the histograms as JSON.
+#
+
+from collections import OrderedDict
+import json
+import math
+import os
+from os.path import join
+import threading
+from time import gmtime, perf_counter, strftime, time
+
+import tkinter as tk
+from tkinter import ttk
+
+from config import applongname, appversion, config
+
+BUCKETS_PER_OCTAVE = 4
+BUCKETS = 30 * BUCKETS_PER_OCTAVE + 1	# 1us to ~17 minutes
+
+enabled = bool(config.getint('trace_latency'))
+
+current = None	# Record of the entry being dispatched to plugins
+
+
+class Record(object):
+    __slots__ = ('detected', 'lag', 'read')
+
+    def __init__(self, detected, lag):
+        self.detected = detected	# perf_counter when watchdog told us
+        self.lag = lag			# seconds from file modified to detected
+        self.read = perf_counter()
+
+
+class Histogram(object):
+    # Log-bucketed, so constant size however many samples. Bucket i holds values up to 2^(i/BUCKETS_PER_OCTAVE) us.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.counts = [0] * BUCKETS
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def add(self, seconds):
+        us = max(seconds * 1000000, 0)	# mtime can be a little ahead of time()
+        i = us > 1 and min(BUCKETS - 1, int(math.log2(us) * BUCKETS_PER_OCTAVE) + 1) or 0
+        with self.lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += us
+            self.max = max(self.max, us)
+
+    def percentile(self, p):
+        # in us - upper bound of the bucket holding the p'th percentile
+        with self.lock:
+            target = math.ceil(self.count * p / 100)
+            seen = 0
+            for i, n in enumerate(self.counts):
+                seen += n
+                if n and seen >= target:
+                    return min(2 ** (i / BUCKETS_PER_OCTAVE), self.max)
+            return 0
+
+    def summary(self):
+        return OrderedDict([
+            ('count', self.count),
+            ('mean_ms', self.count and round(self.total / self.count / 1000, 3) or 0),
+            ('p50_ms', round(self.percentile(50) / 1000, 3)),
+            ('p90_ms', round(self.percentile(90) / 1000, 3)),
+            ('p99_ms', round(self.percentile(99) / 1000, 3)),
+            ('max_ms', round(self.max / 1000, 3)),
+        ])
+
+
+histograms = OrderedDict()	# by stage
+histograms_lock = threading.Lock()
+
+
+def add(stage, seconds):
+    histogram = histograms.get(stage)
+    if not histogram:
+        with histograms_lock:
+            histogram = histograms.setdefault(stage, Histogram())
+    histogram.add(seconds)
+
+
+def enable(on):
+    global enabled
+    enabled = on
+    config.set('trace_latency', on and 1 or 0)
+
+
+def clear():
+    with histograms_lock:
+        histograms.clear()
+
+
+# Called by the monitor on the watchdog thread. Returns a Record for each line read.
+
+def detected(path):
+    now = perf_counter()
+    try:
+        lag = time() - os.stat(path).st_mtime
+        add('notify', lag)
+    except:
+        lag = 0
+    return (now, lag)
+
+def read(detection):
+    record = Record(*detection)
+    add('read', record.read - record.detected)
+    return record
+
+
+# Called on the Tk thread
+
+def dequeued(record, start, decoded):
+    global current
+    add('queue', start - record.read)
+    add('decode', decoded - start)
+    current = record
+
+def dispatched():
+    global current
+    if current:
+        add('total', current.lag + perf_counter() - current.detected)
+        current = None
+
+def undispatched():
+    # After each entry, whether or not it was dispatched to plugins, so that a later entry's timings aren't added to it
+    global current
+    current = None
+
+
+def snapshot():
+    with histograms_lock:
+        stages = list(histograms.items())
+    return OrderedDict([
+        ('timestamp', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())),
+        ('version', appversion),
+        ('stages', OrderedDict((stage, histogram.summary()) for (stage, histogram) in stages)),
+        ('buckets', OrderedDict((stage, OrderedDict((round(2 ** (i / BUCKETS_PER_OCTAVE), 1), n) for i, n in enumerate(histogram.counts) if n))
+                                for (stage, histogram) in stages)),
+    ])
+
+def export(path):
+    with open(path, 'wt') as h:
+        json.dump(snapshot(), h, indent=2)
+
+
+class LatencyDialog(tk.Toplevel):
+
+    COLUMNS = ['count', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms']
+
+    def __init__(self, parent):
+        tk.Toplevel.__init__(self, parent)
+
+        self.parent = parent
+        self.title(_('Latency'))	# Latency window title
+
+        if parent.winfo_viewable():
+            self.transient(parent)
+
+        frame = ttk.Frame(self)
+        frame.grid(sticky=tk.NSEW)
+        frame.columnconfigure(3, weight=1)
+
+        self.enabled = tk.IntVar(value = enabled and 1)
+        ttk.Checkbutton(frame, text=_('Trace journal latency'), variable=self.enabled, command=self.enablechanged).grid(columnspan=4, padx=10, pady=5, sticky=tk.W)	# Latency window
+
+        self.table = ttk.Treeview(frame, columns=self.COLUMNS, height=12)
+        self.table.heading('#0', text=_('Stage'))	# Latency window column heading
+        self.table.column('#0', width=160)
+        for column in self.COLUMNS:
+            self.table.heading(column, text=column)
+            self.table.column(column, width=70, anchor=tk.E)
+        self.table.grid(row=1, columnspan=4, padx=10, sticky=tk.NSEW)
+
+        ttk.Button(frame, text=_('Clear'), command=self.clear).grid(row=2, column=0, padx=(10,0), pady=5)	# Latency window button
+        ttk.Button(frame, text=_('Export'), command=self.export).grid(row=2, column=1, padx=5, pady=5)	# Latency window button
+        self.status = ttk.Label(frame)
+        self.status.grid(row=2, column=2, columnspan=2, sticky=tk.W)
+
+        self.alarm = None
+        self.protocol("WM_DELETE_WINDOW", self._destroy)
+        self.refresh()
+
+    def refresh(self):
+        stages = snapshot()['stages']
+        existing = set(self.table.get_children())
+        for stage, summary in stages.items():
+            values = [summary[column] for column in self.COLUMNS]
+            if stage in existing:
+                self.table.item(stage, values=values)
+            else:
+                self.table.insert('', 'end', iid=stage, text=stage, values=values)
+        for stage in existing - set(stages):
+            self.table.delete(stage)
+        self.alarm = self.after(1000, self.refresh)
+
+    def enablechanged(self):
+        enable(bool(self.enabled.get()))
+
+    def clear(self):
+        clear()
+        self.status['text'] = ''
+
+    def export(self):
+        path = join(config.get('outdir'), '%s-latency.%s.json' % (applongname, strftime('%Y-%m-%dT%H.%M.%S', gmtime())))
+        try:
+            export(path)
+            self.status['text'] = path
+        except Exception as e:
+            self.status['text'] = str(e)
+
+    def _destroy(self):
+        if self.alarm is not None:
+            self.after_cancel(self.alarm)
+            self.alarm = None
+        self.destroy()
@@ -0,0 +1,128 @@
+#
+# Export of Market journal entries to CSV and Trade Dangerous files.
+#
+# Runs in a background thread so that docking at a busy station doesn't hold up the main window, and skips a market
+# whose prices and stock haven't changed since it was last exported in that format. The exporters in commodity.py
+# and td.py write a line at a time from the entry rather than building the file in memory.
+#
+
+from calendar import timegm
+import hashlib
+import queue
+import threading
+from time import strptime
+from traceback import print_exc
+
+import catalogue
+from config import config
+from monitor import monitor
+from sidefiles import sidefiles
+
+# Result of the last export, for display on the status line
+last_result = {
+    'msg': None,
+}
+
+
+def timestamp(entry):
+    return timegm(strptime(entry['timestamp'], '%Y-%m-%dT%H:%M:%SZ'))
+
+
+def items(entry):
+    # Yields the commodities in a Market entry as dicts with English names and categories
+    commodities = catalogue.get()
+    for item in entry.get('Items', []):
+        commodity = commodities.lookup(item['id'])
+        yield {
+            'id'            : item['id'],
+            'name'          : commodity and commodity.name or item.get('Name_Localised') or monitor.canonicalise(item['Name']),
+            'category'      : commodity and commodity.category or item.get('Category_Localised') or item['Category'],
+            'buyPrice'      : item['BuyPrice'],
+            'sellPrice'     : item['SellPrice'],
+            'meanPrice'     : item['MeanPrice'],
+            'stock'         : item['Stock'],
+            'stockBracket'  : item['StockBracket'] or 0,	# can be ''
+            'demand'        : item['Demand'],
+            'demandBracket' : item['DemandBracket'] or 0,	#   "
+        }
+
+
+def content_hash(entry):
+    # Of what's exported, other than the time
+    h = hashlib.sha1()
+    for item in entry.get('Items', []):
+        h.update(('%s,%s,%s,%s,%s,%s,%s;' % (item['id'], item['BuyPrice'], item['SellPrice'], item['Stock'], item['StockBracket'], item['Demand'], item['DemandBracket'])).encode('utf-8'))
+    return h.hexdigest()
+
+
+def market_file(entry):
+    # The journal's Market entry doesn't have the Items - they're in Market.json. Returns None if that's for another market
+    market = sidefiles.read('Market')
+    if market and market.get('MarketID') == entry.get('MarketID') and market.get('Items'):
+        return market
+    return None
+
+
+class Exporter(object):
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.thread = None
+        self.root = None
+        self.hashes = {}	# (kind, MarketID) -> content_hash of the last export. Only used on the worker thread
+
+    def export(self, entry, kinds, root=None):
+        """
+        Export a Market entry in the background.
+        :param kinds: config.OUT_MKT_CSV and/or config.OUT_MKT_TD
+        :param root: if given, generates <<MarketExportFailed>> on it if an export fails, with the message in last_result['msg']
+        """
+        if not kinds & (config.OUT_MKT_CSV | config.OUT_MKT_TD):
+            return
+        self.root = root
+        self.queue.put((entry, kinds))
+        if not self.thread:
+            self.thread = threading.Thread(target=self.worker, name='Market exporter')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def worker(self):
+        import commodity
+        import td
+        exporters = [
+            (config.OUT_MKT_CSV, lambda entry: commodity.export(entry, commodity.COMMODITY_CSV)),
+            (config.OUT_MKT_TD, td.export),
+        ]
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            (entry, kinds) = item
+            if not entry.get('Items'):
+                entry = market_file(entry)
+                if not entry:
+                    continue
+            digest = content_hash(entry)
+            for (kind, export) in exporters:
+                key = (kind, entry.get('MarketID'))
+                if kinds & kind and self.hashes.get(key) != digest:
+                    try:
+                        export(entry)
+                        self.hashes[key] = digest
+                        last_result['msg'] = None
+                    except Exception as e:
+                        print_exc()
+                        last_result['msg'] = str(e)
+                        if self.root:
+                            self.root.event_generate('<<MarketExportFailed>>', when="tail")
+
+    def close(self):
+        # Finish any exports in progress
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+
+# singleton
+exporter = Exporter()
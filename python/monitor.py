@@ -1,13 +1,18 @@
-from collections import defaultdict, OrderedDict
+from collections import deque, OrderedDict
+from functools import lru_cache
+import hashlib
+import queue
+import sys
 import time
 import json
 import re
 
-from time import gmtime, localtime, sleep, strftime, strptime, time
+from time import gmtime, localtime, perf_counter, sleep, strftime, strptime, time
 import os
 from os import listdir, SEEK_SET, SEEK_CUR, SEEK_END
-from os.path import dirname, expanduser, isdir, join
+from os.path import dirname, exists, expanduser, isdir, join
 from calendar import timegm
+import threading
 if __debug__:
     from traceback import print_exc
 
@@ -15,9 +20,31 @@ from watchdog.observers import Observer
 from watchdog.events import PatternMatchingEventHandler
 
 from config import config
+import latency
+from history import StateHistory
+from inventory import Inventory
+from sidefiles import sidefiles
+
+NAMES_CACHE = 4096	# canonicalise and category results remembered - more than there are commodities, materials and modules
 
 class EDLogs:
 
+    # Fields that can be subscribed to - attributes, then keys of state
+    WATCHED_ATTRIBUTES = ['cmdr', 'is_beta', 'mode', 'group', 'system', 'station', 'planet']
+    WATCHED_STATE = ['Captain', 'Role', 'ShipID', 'ShipType', 'ShipName', 'ShipIdent']
+
+    # Keys of state that are Inventory
+    MATERIALS = ['Raw', 'Manufactured', 'Encoded']
+    INVENTORIES = ['Cargo'] + MATERIALS
+
+    # Order of the standard slots in ship()
+    STANDARD_ORDER = { slot: i for (i, slot) in enumerate(['ShipCockpit', 'CargoHatch', 'Armour', 'PowerPlant', 'MainEngines', 'FrameShiftDrive', 'LifeSupport', 'PowerDistributor', 'Radar', 'FuelTank']) }
+
+    # Events that change state['Modules'] and state['Cargo'], counted so that users of them can tell when to look again
+    LOADOUT_EVENTS = {'Fileheader', 'ShipyardBuy', 'ShipyardSwap', 'Loadout', 'ModuleBuy', 'ModuleSell', 'ModuleSwap', 'EngineerCraft', 'EngineerLegacyConvert'}
+    CARGO_EVENTS = {'Fileheader', 'Cargo', 'CollectCargo', 'MarketBuy', 'BuyDrones', 'MiningRefined', 'EjectCargo', 'MarketSell', 'SellDrones',
+                    'SearchAndRescue', 'MissionCompleted', 'EngineerContribution', 'TechnologyBroker'}
+
     def __init__(self):
         # EDMC Compatible
 
@@ -42,16 +69,22 @@ class EDLogs:
         self.logposstored = 0
         self.logposcurrent = 0
 
+        self.loadout_serial = 0	# incremented on LOADOUT_EVENTS
+        self.cargo_serial = 0	# incremented on CARGO_EVENTS
+        self.ship_cache = (None, None, None)	# see cached_ship
+        self.slot_keys = {}	# slot -> sort key
+        self.history = config.getint('state_history') and StateHistory() or None	# see record_history
+
         self.state = {
             'Captain'      : None,	# On a crew
-            'Cargo'        : defaultdict(int),
+            'Cargo'        : Inventory(),
             'Credits'      : None,
             'FID'          : None,	# Frontier Cmdr ID
             'Horizons'     : None,	# Does this user have Horizons?
             'Loan'         : None,
-            'Raw'          : defaultdict(int),
-            'Manufactured' : defaultdict(int),
-            'Encoded'      : defaultdict(int),
+            'Raw'          : Inventory(),
+            'Manufactured' : Inventory(),
+            'Encoded'      : Inventory(),
             'Engineers'    : {},
             'Rank'         : {},
             'Reputation'   : {},
@@ -72,8 +105,18 @@ class EDLogs:
 
         self.lastloc = None
 
+        self.root = None
+        self.subscribers = {}		# callbacks by field
+        self.watched = {}		# last value of each subscribed field
+        self.changes = deque()		# (field, value) waiting to be sent on the Tk thread
+        self.watch_lock = threading.Lock()
+
+        self.export_queue = queue.Queue()	# ship loadouts waiting to be written
+        self.export_thread = None
+
     def start(self,root):
         self.root = root
+        root.bind_all('<<MonitorChange>>', self.send_changes)
         patterns = ["*.edd"]
         ignore_patterns = ""
         ignore_directories = False
@@ -114,15 +157,19 @@ class EDLogs:
 
     def close(self):
         self.stop()
+        if self.export_thread:
+            self.export_queue.put(None)	# finish writing
+            self.export_thread.join()
+            self.export_thread = None
 
     def on_created(self,event):
         print(f"{event.src_path} has been created!")
 
     def on_modified(self, event):
         #print(f"{event.src_path} has been modified")
-        self.readfile(event.src_path)
+        self.readfile(event.src_path, latency.enabled and latency.detected(event.src_path))
 
-    def readfile(self,path):
+    def readfile(self,path,detection=None):	# detection is set if tracing latency
         loghandle = open(path, 'rb', 0)	# unbuffered
 
         if 'current' in path:
@@ -130,7 +177,7 @@ class EDLogs:
 
             for line in loghandle:
                 print(f'Current Line {line}')
-                self.event_queue.append(line)
+                self.event_queue.append(detection and (line, latency.read(detection)) or line)
                 self.root.event_generate('<<JournalEvent>>', when="tail")
 
             self.logposcurrent = loghandle.tell();
@@ -141,9 +188,10 @@ class EDLogs:
             for line in loghandle:
                 print(f'Stored Line {line}')
                 entry = self.parse_entry(line)             # stored ones are parsed now for state update
+                self.check_changes()
 
                 if entry['event'] == 'Harness-NewVersion':      # send this thru to the foreground for processing
-                    self.event_queue.append(line)
+                    self.event_queue.append(detection and (line, latency.read(detection)) or line)
                     self.root.event_generate('<<JournalEvent>>', when="tail")
 
                 elif entry['event'] == 'Location' or entry['event'] == 'FSDJump':     # for now, not going to do anything with this, but may feed it thru if required later
@@ -166,10 +214,11 @@ class EDLogs:
                             entry['StationName'] = self.station
                             entry['StationType'] = self.stationtype
 
-                        self.event_queue.append(json.dumps(entry, separators=(', ', ':')))
+                        line = json.dumps(entry, separators=(', ', ':'))
+                        self.event_queue.append(detection and (line, latency.read(detection)) or line)
                     else:
                         print("No location, send a None")
-                        self.event_queue.append(None)	# Generate null event to update the display (with possibly out-of-date info)
+                        self.event_queue.append(detection and (None, latency.read(detection)) or None)	# Generate null event to update the display (with possibly out-of-date info)
 
                     self.root.event_generate('<<JournalEvent>>', when="tail")   # generate an event for the foreground
 
@@ -179,9 +228,68 @@ class EDLogs:
         if not self.event_queue:
             return None
         else:
-            entry = self.parse_entry(self.event_queue.pop(0))
+            line = self.event_queue.pop(0)
+            if isinstance(line, tuple):	# tracing latency
+                (line, record) = line
+                start = perf_counter()
+                entry = self.parse_entry(line)
+                latency.dequeued(record, start, perf_counter())
+            else:
+                entry = self.parse_entry(line)
+            self.check_changes()
             return entry
 
+    # Change notification, so that interested parties don't have to poll or compare state on every entry
+
+    def subscribe(self, field, callback):
+        """
+        Call callback(field, value) on the Tk thread whenever field changes.
+        :param field: One of WATCHED_ATTRIBUTES or WATCHED_STATE e.g. 'cmdr', 'system', 'ShipType'
+        :raises KeyError: if field can't be watched
+        """
+        if field not in self.WATCHED_ATTRIBUTES and field not in self.WATCHED_STATE:
+            raise KeyError(field)
+        with self.watch_lock:
+            if field not in self.watched:
+                self.watched[field] = self.field(field)
+            self.subscribers.setdefault(field, []).append(callback)
+
+    def unsubscribe(self, field, callback):
+        with self.watch_lock:
+            if callback in self.subscribers.get(field, []):
+                self.subscribers[field].remove(callback)
+                if not self.subscribers[field]:
+                    del self.subscribers[field]
+                    del self.watched[field]
+
+    def field(self, field):
+        return self.state.get(field) if field in self.WATCHED_STATE else getattr(self, field)
+
+    def check_changes(self):
+        # Called after each entry is parsed, on either thread
+        if not self.watched:
+            return
+        with self.watch_lock:
+            for field, last in self.watched.items():
+                value = self.field(field)
+                if value != last:
+                    self.watched[field] = value
+                    self.changes.append((field, value))
+        if self.changes:
+            if self.root:
+                self.root.event_generate('<<MonitorChange>>', when="tail")
+            else:
+                self.send_changes()	# not started e.g. replaying a journal
+
+    def send_changes(self, event=None):
+        while self.changes:
+            (field, value) = self.changes.popleft()
+            for callback in list(self.subscribers.get(field, [])):
+                try:
+                    callback(field, value)
+                except:
+                    if __debug__: print_exc()
+
 # Direct from EDMC, synced 15 July 2020 with f7aa85a02d9e20c68bffc84161b620af5431cf7a
 
     def parse_entry(self, line):
@@ -189,6 +297,8 @@ class EDLogs:
             return { 'event': None }	# Fake startup event
 
         try:
+            for category in self.INVENTORIES:
+                self.state[category].begin()
             entry = json.loads(line, object_pairs_hook=OrderedDict)	# Preserve property order because why not?
             entry['timestamp']	# we expect this to exist
             if entry['event'] == 'Fileheader':
@@ -209,14 +319,14 @@ class EDLogs:
                 self.started = None
                 self.state = {
                     'Captain'      : None,
-                    'Cargo'        : defaultdict(int),
+                    'Cargo'        : Inventory(),
                     'Credits'      : None,
                     'FID'          : None,
                     'Horizons'     : None,
                     'Loan'         : None,
-                    'Raw'          : defaultdict(int),
-                    'Manufactured' : defaultdict(int),
-                    'Encoded'      : defaultdict(int),
+                    'Raw'          : Inventory(),
+                    'Manufactured' : Inventory(),
+                    'Encoded'      : Inventory(),
                     'Engineers'    : {},
                     'Rank'         : {},
                     'Reputation'   : {},
@@ -377,63 +487,38 @@ class EDLogs:
                     self.state['Engineers'][entry['Engineer']] = (entry['Rank'], entry.get('RankProgress', 0)) if 'Rank' in entry else entry['Progress']
 
             elif entry['event'] == 'Cargo' and entry.get('Vessel') == 'Ship':
-                self.state['Cargo'] = defaultdict(int)
-                if 'Inventory' not in entry:	# From 3.3 full Cargo event (after the first one) is written to a separate file
-                    with open(join(self.currentdir, 'Cargo.json'), 'rb') as h:
-                        entry = json.load(h, object_pairs_hook=OrderedDict)	# Preserve property order because why not?
-                self.state['Cargo'].update({ self.canonicalise(x['Name']): x['Count'] for x in entry['Inventory'] })
+                inventory = entry.get('Inventory')
+                if inventory is None:	# From 3.3 full Cargo event (after the first one) is written to a separate file
+                    cargo = sidefiles.read('Cargo')
+                    inventory = cargo and cargo.get('Vessel', 'Ship') == 'Ship' and cargo.get('Inventory') or None
+                if inventory is not None:	# else leave as it was
+                    self.state['Cargo'].replace((self.canonicalise(x['Name']), x['Count']) for x in inventory)
             elif entry['event'] in ['CollectCargo', 'MarketBuy', 'BuyDrones', 'MiningRefined']:
-                commodity = self.canonicalise(entry['Type'])
-                self.state['Cargo'][commodity] += entry.get('Count', 1)
+                self.state['Cargo'].add(self.canonicalise(entry['Type']), entry.get('Count', 1))
             elif entry['event'] in ['EjectCargo', 'MarketSell', 'SellDrones']:
-                commodity = self.canonicalise(entry['Type'])
-                self.state['Cargo'][commodity] -= entry.get('Count', 1)
-                if self.state['Cargo'][commodity] <= 0:
-                    self.state['Cargo'].pop(commodity)
+                self.state['Cargo'].remove(self.canonicalise(entry['Type']), entry.get('Count', 1))
             elif entry['event'] == 'SearchAndRescue':
                 for item in entry.get('Items', []):
-                    commodity = self.canonicalise(item['Name'])
-                    self.state['Cargo'][commodity] -= item.get('Count', 1)
-                    if self.state['Cargo'][commodity] <= 0:
-                        self.state['Cargo'].pop(commodity)
+                    self.state['Cargo'].remove(self.canonicalise(item['Name']), item.get('Count', 1))
 
             elif entry['event'] == 'Materials':
-                for category in ['Raw', 'Manufactured', 'Encoded']:
-                    self.state[category] = defaultdict(int)
-                    self.state[category].update({ self.canonicalise(x['Name']): x['Count'] for x in entry.get(category, []) })
+                for category in self.MATERIALS:
+                    self.state[category].replace((self.canonicalise(x['Name']), x['Count']) for x in entry.get(category, []))
             elif entry['event'] == 'MaterialCollected':
-                material = self.canonicalise(entry['Name'])
-                self.state[entry['Category']][material] += entry['Count']
+                self.state[entry['Category']].add(self.canonicalise(entry['Name']), entry['Count'])
             elif entry['event'] in ['MaterialDiscarded', 'ScientificResearch']:
-                material = self.canonicalise(entry['Name'])
-                self.state[entry['Category']][material] -= entry['Count']
-                if self.state[entry['Category']][material] <= 0:
-                    self.state[entry['Category']].pop(material)
+                self.state[entry['Category']].remove(self.canonicalise(entry['Name']), entry['Count'])
             elif entry['event'] == 'Synthesis':
-                for category in ['Raw', 'Manufactured', 'Encoded']:
-                    for x in entry['Materials']:
-                        material = self.canonicalise(x['Name'])
-                        if material in self.state[category]:
-                            self.state[category][material] -= x['Count']
-                            if self.state[category][material] <= 0:
-                                self.state[category].pop(material)
+                for x in entry['Materials']:
+                    self.remove_material(self.canonicalise(x['Name']), x['Count'])
             elif entry['event'] == 'MaterialTrade':
-                category = self.category(entry['Paid']['Category'])
-                self.state[category][entry['Paid']['Material']] -= entry['Paid']['Quantity']
-                if self.state[category][entry['Paid']['Material']] <= 0:
-                    self.state[category].pop(entry['Paid']['Material'])
-                category = self.category(entry['Received']['Category'])
-                self.state[category][entry['Received']['Material']] += entry['Received']['Quantity']
+                self.state[self.category(entry['Paid']['Category'])].remove(entry['Paid']['Material'], entry['Paid']['Quantity'])
+                self.state[self.category(entry['Received']['Category'])].add(entry['Received']['Material'], entry['Received']['Quantity'])
 
             elif entry['event'] == 'EngineerCraft' or (entry['event'] == 'EngineerLegacyConvert' and not entry.get('IsPreview')):
-                for category in ['Raw', 'Manufactured', 'Encoded']:
-                    for x in entry.get('Ingredients', []):
-                        material = self.canonicalise(x['Name'])
-                        if material in self.state[category]:
-                            self.state[category][material] -= x['Count']
-                            if self.state[category][material] <= 0:
-                                self.state[category].pop(material)
-                module = self.state['Modules'][entry['Slot']]
+                for x in entry.get('Ingredients', []):
+                    self.remove_material(self.canonicalise(x['Name']), x['Count'])
+                module = self.state['Modules'][entry['Slot']] = dict(self.state['Modules'][entry['Slot']])	# replaced rather than changed, for StateHistory
                 assert(module['Item'] == self.canonicalise(entry['Module']))
                 module['Engineering'] = {
                     'Engineer'      : entry['Engineer'],
@@ -453,45 +538,24 @@ class EDLogs:
 
             elif entry['event'] == 'MissionCompleted':
                 for reward in entry.get('CommodityReward', []):
-                    commodity = self.canonicalise(reward['Name'])
-                    self.state['Cargo'][commodity] += reward.get('Count', 1)
+                    self.state['Cargo'].add(self.canonicalise(reward['Name']), reward.get('Count', 1))
                 for reward in entry.get('MaterialsReward', []):
                     if 'Category' in reward:	# Category not present in E:D 3.0
-                        category = self.category(reward['Category'])
-                        material = self.canonicalise(reward['Name'])
-                        self.state[category][material] += reward.get('Count', 1)
+                        self.state[self.category(reward['Category'])].add(self.canonicalise(reward['Name']), reward.get('Count', 1))
             elif entry['event'] == 'EngineerContribution':
                 commodity = self.canonicalise(entry.get('Commodity'))
                 if commodity:
-                    self.state['Cargo'][commodity] -= entry['Quantity']
-                    if self.state['Cargo'][commodity] <= 0:
-                        self.state['Cargo'].pop(commodity)
+                    self.state['Cargo'].remove(commodity, entry['Quantity'])
                 material = self.canonicalise(entry.get('Material'))
                 if material:
-                    for category in ['Raw', 'Manufactured', 'Encoded']:
-                        if material in self.state[category]:
-                            self.state[category][material] -= entry['Quantity']
-                            if self.state[category][material] <= 0:
-                                self.state[category].pop(material)
+                    self.remove_material(material, entry['Quantity'])
             elif entry['event'] == 'TechnologyBroker':
                 for thing in entry.get('Ingredients', []):	# 3.01
-                    for category in ['Cargo', 'Raw', 'Manufactured', 'Encoded']:
-                        item = self.canonicalise(thing['Name'])
-                        if item in self.state[category]:
-                            self.state[category][item] -= thing['Count']
-                            if self.state[category][item] <= 0:
-                                self.state[category].pop(item)
+                    self.remove_material(self.canonicalise(thing['Name']), thing['Count'], self.INVENTORIES)
                 for thing in entry.get('Commodities', []):	# 3.02
-                    commodity = self.canonicalise(thing['Name'])
-                    self.state['Cargo'][commodity] -= thing['Count']
-                    if self.state['Cargo'][commodity] <= 0:
-                        self.state['Cargo'].pop(commodity)
+                    self.state['Cargo'].remove(self.canonicalise(thing['Name']), thing['Count'])
                 for thing in entry.get('Materials', []):	# 3.02
-                    material = self.canonicalise(thing['Name'])
-                    category = thing['Category']
-                    self.state[category][material] -= thing['Count']
-                    if self.state[category][material] <= 0:
-                        self.state[category].pop(material)
+                    self.state[thing['Category']].remove(self.canonicalise(thing['Name']), thing['Count'])
 
             elif entry['event'] == 'JoinACrew':
                 self.state['Captain'] = entry['Captain']
@@ -525,6 +589,13 @@ class EDLogs:
             elif entry['event'] == 'Shutdown':
                 self.live = False
 
+            if entry['event'] in self.LOADOUT_EVENTS:
+                self.loadout_serial += 1
+            if entry['event'] in self.CARGO_EVENTS:
+                self.cargo_serial += 1
+            if self.history:
+                self.history.record(entry['timestamp'], self)
+
             return entry
         except:
             if __debug__:
@@ -532,33 +603,86 @@ class EDLogs:
                 print_exc()
             return { 'event': None }
 
+    # State at an earlier time, for plugins that would otherwise have to replay the journal
+
+    def record_history(self, on=True):
+        # Start or stop recording state for state_at. Also set at startup by config 'state_history'
+        self.history = on and (self.history or StateHistory()) or None
+
+    def state_at(self, when):
+        """
+        State and location as they were at an earlier time, if recording.
+        :param when: journal timestamp e.g. '2020-07-15T12:34:56Z', or seconds since the epoch
+        :return: dict of the keys of state plus 'cmdr', 'system', 'station', 'coordinates' etc, or None if not recording
+        or when is before the retained history. Values are shared - copy before changing.
+        """
+        history = self.history
+        return history and history.at(when)
+
+    def remove_material(self, material, count, categories=MATERIALS):
+        # From whichever categories hold it
+        for category in categories:
+            if material in self.state[category]:
+                self.state[category].remove(material, count)
+
     _RE_CANONICALISE = re.compile(r'\$(.+)_name;')
     _RE_CATEGORY = re.compile(r'\$MICRORESOURCE_CATEGORY_(.+);')
 
     # Commodities, Modules and Ships can appear in different forms e.g. "$HNShockMount_Name;", "HNShockMount", and "hnshockmount",
     # "$int_cargorack_size6_class1_name;" and "Int_CargoRack_Size6_Class1", "python" and "Python", etc.
     # This returns a simple lowercased name e.g. 'hnshockmount', 'int_cargorack_size6_class1', 'python', etc
-    def canonicalise(self, item):
+    # There are only so many names, so results are remembered, and interned so that every state key for a name is the
+    # same string.
+    @staticmethod
+    @lru_cache(maxsize=NAMES_CACHE)
+    def canonicalise(item):
         if not item: return ''
         item = item.lower()
-        match = self._RE_CANONICALISE.match(item)
-        return match and match.group(1) or item
+        match = EDLogs._RE_CANONICALISE.match(item)
+        return sys.intern(match and match.group(1) or item)
 
-    def category(self, item):
-        match = self._RE_CATEGORY.match(item)
-        return (match and match.group(1) or item).capitalize()
+    @staticmethod
+    @lru_cache(maxsize=NAMES_CACHE)
+    def category(item):
+        match = EDLogs._RE_CATEGORY.match(item)
+        return sys.intern((match and match.group(1) or item).capitalize())
 
 
-    # Return a subset of the received data describing the current ship as a Loadout event
+    # Return a subset of the received data describing the current ship as a Loadout event.
+    # Remembered until the ship or its modules change, so the result is shared - copy it before changing it.
     def ship(self, timestamped=True):
+        d = self.cached_ship()[1]
+        if not d or not timestamped:
+            return d
+        return OrderedDict([('timestamp', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime()))] + list(d.items()))
+
+    # Returns a hash of ship(), or None, so that users of it can tell when it has changed
+    def ship_hash(self):
+        (key, d, digest) = self.cached_ship()
+        if d and not digest:
+            digest = hashlib.sha1(json.dumps(d, sort_keys=True).encode('utf-8')).hexdigest()
+            self.ship_cache = (key, d, digest)
+        return digest
+
+    def cached_ship(self):
+        # (key, ship, hash or None)
+        key = (self.loadout_serial, self.state['ShipType'], self.state['ShipID'], self.state['ShipName'], self.state['ShipIdent'])
+        if self.ship_cache[0] != key:
+            self.ship_cache = (key, self.build_ship(), None)
+        return self.ship_cache
+
+    def slot_key(self, slot):
+        # sort modules by slot - hardpoints, standard, internal
+        key = self.slot_keys.get(slot)
+        if not key:
+            key = self.slot_keys[slot] = ('Hardpoint' not in slot, self.STANDARD_ORDER.get(slot, len(self.STANDARD_ORDER)), 'Slot' not in slot, slot)
+        return key
+
+    def build_ship(self):
         if not self.state['Modules']:
             return None
 
-        standard_order = ['ShipCockpit', 'CargoHatch', 'Armour', 'PowerPlant', 'MainEngines', 'FrameShiftDrive', 'LifeSupport', 'PowerDistributor', 'Radar', 'FuelTank']
-
         d = OrderedDict()
-        if timestamped:
-            d['timestamp'] = strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())
         d['event'] = 'Loadout'
         d['Ship'] = self.state['ShipType']
         d['ShipID'] = self.state['ShipID']
@@ -566,9 +690,8 @@ class EDLogs:
             d['ShipName'] = self.state['ShipName']
         if self.state['ShipIdent']:
             d['ShipIdent'] = self.state['ShipIdent']
-        # sort modules by slot - hardpoints, standard, internal
         d['Modules'] = []
-        for slot in sorted(self.state['Modules'], key=lambda x: ('Hardpoint' not in x, x not in standard_order and len(standard_order) or standard_order.index(x), 'Slot' not in x, x)):
+        for slot in sorted(self.state['Modules'], key=self.slot_key):
             module = dict(self.state['Modules'][slot])
             module.pop('Health', None)
             module.pop('Value', None)
@@ -580,27 +703,71 @@ class EDLogs:
         string = json.dumps(self.ship(False), ensure_ascii=False, indent=2, separators=(',', ': '))	# pretty print
 
         if filename:
-            with open(filename, 'wt') as h:
-                h.write(string)
+            write_file(filename, string)
             return
 
-        ship = ship_file_name(self.state['ShipName'], self.state['ShipType'])
-        regexp = re.compile(re.escape(ship) + '\.\d\d\d\d\-\d\d\-\d\dT\d\d\.\d\d\.\d\d\.txt')
-        oldfiles = sorted([x for x in listdir(config.get('outdir')) if regexp.match(x)])
-        if oldfiles:
-            with open(join(config.get('outdir'), oldfiles[-1]), 'rU') as h:
-                if h.read() == string:
-                    return	# same as last time - don't write
-
-        # Write
-        filename = join(config.get('outdir'), '%s.%s.txt' % (ship, strftime('%Y-%m-%dT%H.%M.%S', localtime(time()))))
-        with open(filename, 'wt') as h:
-            h.write(string)
+        # To outdir, in the background, only if changed since the last export of this ship
+        from companion import ship_file_name
+        self.export_queue.put((ship_file_name(self.state['ShipName'], self.state['ShipType']), string, time()))
+        if not self.export_thread:
+            self.export_thread = threading.Thread(target=self.export_worker, name='Ship exporter')
+            self.export_thread.daemon = True
+            self.export_thread.start()
+
+    def export_worker(self):
+        # Keeps an index of the hash and filename of the last export of each ship to each outdir, rather than looking
+        # through outdir. Keyed by join(outdir, ship) since the user can change outdir
+        indexfile = join(config.cache_dir, 'shipexports.json')
+        try:
+            with open(indexfile, 'rt', encoding='utf-8') as h:
+                index = json.load(h)
+        except:
+            index = {}	# Missing or corrupt
+
+        while True:
+            item = self.export_queue.get()
+            if item is None:
+                return
+            (ship, string, when) = item
+            digest = hashlib.sha1(string.encode('utf-8')).hexdigest()
+            try:
+                outdir = config.get('outdir')
+                key = join(outdir, ship)
+                if key not in index:
+                    index[key] = self.last_export(outdir, ship)	# e.g. exported before there was an index
+                if index[key] and index[key]['hash'] == digest and exists(index[key]['filename']):
+                    continue	# same as last time - don't write
+
+                filename = join(outdir, '%s.%s.txt' % (ship, strftime('%Y-%m-%dT%H.%M.%S', localtime(when))))
+                write_file(filename, string)
+                index[key] = { 'hash': digest, 'filename': filename }
+                if not isdir(config.cache_dir):
+                    os.makedirs(config.cache_dir)
+                write_file(indexfile, json.dumps(index, ensure_ascii=False))
+            except:
+                if __debug__: print_exc()
+
+    def last_export(self, outdir, ship):
+        # Hash and filename of the latest export of ship in outdir, or None
+        regexp = re.compile(re.escape(ship) + r'\.\d\d\d\d\-\d\d\-\d\dT\d\d\.\d\d\.\d\d\.txt')
+        oldfiles = sorted([x for x in listdir(outdir) if regexp.match(x)])
+        if not oldfiles:
+            return None
+        filename = join(outdir, oldfiles[-1])
+        with open(filename, 'rt', encoding='utf-8', errors='replace') as h:	# may be from before exports were UTF-8
+            return { 'hash': hashlib.sha1(h.read().encode('utf-8')).hexdigest(), 'filename': filename }
 
     def game_running():
         return True
 
 
+def write_file(filename, string):
+    # Via a temporary file so that a half-written file is never left behind
+    with open(filename + '.tmp', 'wt', encoding='utf-8') as h:
+        h.write(string)
+    os.replace(filename + '.tmp', filename)
+
+
 # singleton
 monitor = EDLogs()
 
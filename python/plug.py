@@ -9,12 +9,15 @@ import importlib.machinery
 import sys
 import operator
 import threading	# We don't use it, but plugins might
+from time import perf_counter
 from traceback import print_exc
 
 import tkinter as tk
 import myNotebook as nb
 
 from config import config
+from inventory import Inventory
+import latency
 
 # Dashboard Flags constants
 FlagsDocked = 1<<0		# on a landing pad
@@ -302,15 +305,25 @@ def notify_journal_entry(cmdr, is_beta, system, station, entry, state):
     :returns: Error message from the first plugin that returns one (if any)
     """
     error = None
+    timing = latency.enabled
+    # Cargo and materials as read-only dicts of how they are now, with what this entry changed in their delta. So
+    # plugins can keep them without them changing underneath.
+    plugin_state = dict(state)
+    plugin_state.update({ k: v.as_dict() for (k, v) in state.items() if type(v) is Inventory })
     for plugin in PLUGINS:
         journal_entry = plugin._get_func('journal_entry')
         if journal_entry:
             try:
-                # Pass a copy of the journal entry in case the callee modifies it
-                newerror = journal_entry(cmdr, is_beta, system, station, dict(entry), dict(state))
+                start = timing and perf_counter()
+                # Pass a copy of the journal entry and state in case the callee modifies them
+                newerror = journal_entry(cmdr, is_beta, system, station, dict(entry), dict(plugin_state))
+                if timing:
+                    latency.add('plugin ' + plugin.name, perf_counter() - start)
                 error = error or newerror
             except:
                 print_exc()
+    if timing:
+        latency.dispatched()
     return error
 
 
@@ -87,7 +87,6 @@ class PreferencesDialog(tk.Toplevel):
 
         self.cmdr = False	# Note if Cmdr changes in the Journal
         self.is_beta = False	# Note if Beta status changes in the Journal
-        self.cmdrchanged_alarm = None
 
         frame = ttk.Frame(self)
         frame.grid(sticky=tk.NSEW)
@@ -106,12 +105,12 @@ class PreferencesDialog(tk.Toplevel):
 
         self.out_label = nb.Label(outframe, text=_('Please choose what data to save'))
         self.out_label.grid(columnspan=2, padx=PADX, sticky=tk.W)
-#        self.out_csv = tk.IntVar(value = (output & config.OUT_MKT_CSV ) and 1)
-#        self.out_csv_button = nb.Checkbutton(outframe, text=_('Market data in CSV format file'), variable=self.out_csv, command=self.outvarchanged)
-#        self.out_csv_button.grid(columnspan=2, padx=BUTTONX, sticky=tk.W)
-#        self.out_td  = tk.IntVar(value = (output & config.OUT_MKT_TD  ) and 1)
-#        self.out_td_button = nb.Checkbutton(outframe, text=_('Market data in Trade Dangerous format file'), variable=self.out_td, command=self.outvarchanged)
-#        self.out_td_button.grid(columnspan=2, padx=BUTTONX, sticky=tk.W)
+        self.out_csv = tk.IntVar(value = (output & config.OUT_MKT_CSV ) and 1)
+        self.out_csv_button = nb.Checkbutton(outframe, text=_('Market data in CSV format file'), variable=self.out_csv, command=self.outvarchanged)	# Output setting
+        self.out_csv_button.grid(columnspan=2, padx=BUTTONX, sticky=tk.W)
+        self.out_td  = tk.IntVar(value = (output & config.OUT_MKT_TD  ) and 1)
+        self.out_td_button = nb.Checkbutton(outframe, text=_('Market data in Trade Dangerous format file'), variable=self.out_td, command=self.outvarchanged)	# Output setting
+        self.out_td_button.grid(columnspan=2, padx=BUTTONX, sticky=tk.W)
         self.out_ship= tk.IntVar(value = (output & config.OUT_SHIP) and 1)
         self.out_ship_button = nb.Checkbutton(outframe, text=_('Ship loadout'), variable=self.out_ship, command=self.outvarchanged)	# Output setting
         self.out_ship_button.grid(columnspan=2, padx=BUTTONX, pady=(5,0), sticky=tk.W)
@@ -227,6 +226,8 @@ class PreferencesDialog(tk.Toplevel):
 
         # Selectively disable buttons depending on output settings
         self.cmdrchanged()
+        monitor.subscribe('cmdr', self.cmdrchanged)
+        monitor.subscribe('is_beta', self.cmdrchanged)
 
         # wait for window to appear on screen before calling grab_set
         self.parent.update_idletasks()
@@ -243,7 +244,7 @@ class PreferencesDialog(tk.Toplevel):
                                             0x10000, None, position):
                 self.geometry("+%d+%d" % (position.left, position.top))
 
-    def cmdrchanged(self, event=None):
+    def cmdrchanged(self, field=None, value=None):
         if self.cmdr != monitor.cmdr or self.is_beta != monitor.is_beta:
             # Cmdr has changed - update settings
             if self.cmdr is not False:		# Don't notify on first run
@@ -251,9 +252,6 @@ class PreferencesDialog(tk.Toplevel):
             self.cmdr = monitor.cmdr
             self.is_beta = monitor.is_beta
 
-        # Poll
-        self.cmdrchanged_alarm = self.after(1000, self.cmdrchanged)
-
     def tabchanged(self, event):
         self.outvarchanged()
         if platform == 'darwin':
@@ -269,10 +267,9 @@ class PreferencesDialog(tk.Toplevel):
         self.displaypath(self.outdir, self.outdir_entry)
 
         self.out_label['state'] = tk.NORMAL or tk.DISABLED
-        #self.out_csv_button['state'] = self.out_td_button['state'] = tk.NORMAL or tk.DISABLED
+        self.out_csv_button['state'] = self.out_td_button['state'] = tk.NORMAL or tk.DISABLED
         self.out_ship_button['state'] = tk.NORMAL or tk.DISABLED
-        #local = self.out_td.get() or self.out_csv.get() or self.out_ship.get()
-        local = self.out_ship.get()
+        local = self.out_td.get() or self.out_csv.get() or self.out_ship.get()
         self.outdir_label['state']      = local and tk.NORMAL  or tk.DISABLED
         self.outbutton['state']         = local and tk.NORMAL  or tk.DISABLED
         self.outdir_entry['state']      = local and 'readonly' or tk.DISABLED
@@ -362,9 +359,8 @@ class PreferencesDialog(tk.Toplevel):
 
     def apply(self):
         config.set('output',
-#                   (self.out_td.get()   and config.OUT_MKT_TD) +
-#                   (self.out_csv.get()  and config.OUT_MKT_CSV) +
-                   (0) +
+                   (self.out_td.get()   and config.OUT_MKT_TD) +
+                   (self.out_csv.get()  and config.OUT_MKT_CSV) +
                    (self.out_ship.get() and config.OUT_SHIP) +
                    (config.getint('output') & (config.OUT_MKT_EDDN | config.OUT_SYS_EDDN | config.OUT_SYS_DELAY)))
 
@@ -390,9 +386,8 @@ class PreferencesDialog(tk.Toplevel):
         self._destroy()
 
     def _destroy(self):
-        if self.cmdrchanged_alarm is not None:
-            self.after_cancel(self.cmdrchanged_alarm)
-            self.cmdrchanged_alarm = None
+        monitor.unsubscribe('cmdr', self.cmdrchanged)
+        monitor.unsubscribe('is_beta', self.cmdrchanged)
         self.parent.wm_attributes('-topmost', config.getint('always_ontop') and 1 or 0)
         self.destroy()
 
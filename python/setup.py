@@ -31,6 +31,9 @@ print(f"Python running from {os.path.dirname(sys.executable)}")
 
 import requests.certs
 
+import stations
+stations.build('stations.p', 'stations.dat')	# memory-mapped version of stations.p
+
 MAINPROG = 'eddedmc.py'
 ICONAME = 'EDDEDMC.ico'
 WINNAME = 'eddedmcwin'
@@ -46,7 +49,8 @@ DATA_FILES = [
         'snd_bad.wav',
         'modules.p',
         'ships.p',
-        'stations.p',
+        'stations.p',	# for existing plugins
+        'stations.dat',
         'systems.p',
         '%s/DLLs/sqlite3.dll' % (sys.base_prefix),
     ]),
@@ -67,6 +71,10 @@ OPTIONS =  { 'py2exe':
                         'shutil',         # Included for plugins
                         'zipfile',        # Included for plugins
                         'timeout_session',
+                        'companion',      # Included for plugins - no longer imported at startup
+                        'stations',       # Included for plugins
+                        'jumprange',      # Included for plugins
+                        'catalogue',      # Included for plugins
                         'csv'
                     ],
                     'excludes': [
@@ -0,0 +1,71 @@
+#
+# The JSON files that the game writes alongside the journal - Cargo.json, Market.json, Status.json, NavRoute.json etc.
+#
+# Parsed contents are kept until the file's mtime or size changes, so callers can read them as often as they like.
+# The game rewrites these files in place, so a read can catch one half-written. Those reads are retried, and if
+# the file still can't be read the last good contents are returned.
+#
+
+from collections import OrderedDict
+import json
+import os
+from os.path import join
+import threading
+from time import sleep
+
+from config import config
+
+RETRIES = 5
+RETRY_DELAY = 0.02	# seconds
+
+
+class SideFiles(object):
+
+    def __init__(self):
+        self.cache = {}	# path -> ((mtime, size), contents)
+        self.lock = threading.Lock()
+
+    def folder(self):
+        return config.get('journaldir') or config.default_journal_dir
+
+    def read(self, name):
+        """
+        Contents of a side file e.g. read('Cargo'). Shared - copy before changing.
+        :return: dict, or None if the file doesn't exist or has never been read successfully
+        """
+        folder = self.folder()
+        if not folder:
+            return None
+        path = join(folder, name + '.json')
+        with self.lock:	# only held to look at or change the cache, since this can be called on the Tk thread
+            cached = self.cache.get(path)
+        for i in range(RETRIES):
+            try:
+                stamp = self.stamp(path)
+                if cached and cached[0] == stamp:
+                    return cached[1]
+                with open(path, 'rb') as h:
+                    data = h.read()
+                if self.stamp(path) == stamp:	# not rewritten while we were reading
+                    contents = json.loads(data, object_pairs_hook=OrderedDict)	# Preserve property order because why not?
+                    with self.lock:
+                        self.cache[path] = (stamp, contents)
+                    return contents
+            except FileNotFoundError:
+                with self.lock:
+                    self.cache.pop(path, None)
+                return None
+            except (OSError, ValueError):
+                pass	# torn read, or locked while the game writes it
+            sleep(RETRY_DELAY)
+        if __debug__:
+            print('Couldn\'t read %s' % path)
+        return cached and cached[1]
+
+    def stamp(self, path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+
+# singleton
+sidefiles = SideFiles()
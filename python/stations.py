@@ -0,0 +1,129 @@
+#
+# Station ids by system id and station name, for plugins.
+#
+# stations.p is a pickled dict of (system_id, name) -> station_id, which costs a lot of time and memory to load for
+# the few lookups a plugin makes. stations.dat holds the same data as fixed-width records sorted by system id and
+# name, followed by the names, and is memory-mapped so only the pages that are looked at are read.
+#
+# Built by setup.py, or "py stations.py". If it's missing or older than stations.p it's built in the cache folder.
+#
+
+import mmap
+import os
+from os.path import exists, getmtime, join
+import pickle
+import struct
+
+from config import config
+
+MAGIC = b'EDDSTNS\x01'
+HEADER = struct.Struct('<8sI')		# magic, number of records
+RECORD = struct.Struct('<IIIB')		# system_id, station_id, offset of name, length of name
+
+
+def build(source, dest):
+    with open(source, 'rb') as h:
+        stations = pickle.load(h)
+
+    records = []
+    names = bytearray()
+    for (system_id, name), station_id in sorted(stations.items()):
+        encoded = name.encode('utf-8')
+        records.append(RECORD.pack(system_id, station_id, len(names), len(encoded)))
+        names += encoded
+
+    with open(dest + '.tmp', 'wb') as h:
+        h.write(HEADER.pack(MAGIC, len(records)))
+        h.write(b''.join(records))
+        h.write(names)
+    os.replace(dest + '.tmp', dest)
+
+
+class StationDatabase(object):
+
+    def __init__(self, path):
+        with open(path, 'rb') as h:
+            self.map = mmap.mmap(h.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.count) = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.map.close()
+            raise Exception('%s is not a station database' % path)
+        self.names = HEADER.size + self.count * RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def record(self, i):
+        return RECORD.unpack_from(self.map, HEADER.size + i * RECORD.size)
+
+    def name(self, offset, length):
+        return self.map[self.names + offset : self.names + offset + length].decode('utf-8')
+
+    def first(self, system_id):
+        # Index of the first record for system_id, or where it would be
+        lo = 0
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.record(mid)[0] < system_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, system_id, name):
+        # Returns station_id, or None if not known
+        encoded = name.encode('utf-8')
+        i = self.first(system_id)
+        while i < self.count:
+            (record_system, station_id, offset, length) = self.record(i)
+            if record_system != system_id:
+                break
+            elif length == len(encoded) and self.map[self.names + offset : self.names + offset + length] == encoded:
+                return station_id
+            i += 1
+        return None
+
+    def in_system(self, system_id):
+        # Returns list of (name, station_id) sorted by name
+        stations = []
+        i = self.first(system_id)
+        while i < self.count:
+            (record_system, station_id, offset, length) = self.record(i)
+            if record_system != system_id:
+                break
+            stations.append((self.name(offset, length), station_id))
+            i += 1
+        return stations
+
+    def close(self):
+        self.map.close()
+
+
+database = None	# Opened on first use
+
+def open_database():
+    global database
+    if not database:
+        path = join(config.respath, 'stations.dat')
+        source = join(config.respath, 'stations.p')
+        if not exists(path) or (exists(source) and getmtime(source) > getmtime(path)):
+            path = join(config.cache_dir, 'stations.dat')
+            if not exists(source):
+                if not exists(path):
+                    raise FileNotFoundError('Neither stations.p nor stations.dat found in %s' % config.respath)
+            elif not exists(path) or getmtime(source) > getmtime(path):
+                build(source, path)
+        database = StationDatabase(path)
+    return database
+
+def lookup(system_id, name):
+    return open_database().lookup(system_id, name)
+
+def in_system(system_id):
+    return open_database().in_system(system_id)
+
+
+# build station database from pickle
+if __name__ == "__main__":
+    build('stations.p', 'stations.dat')
@@ -0,0 +1,45 @@
+# Export market data in Trade Dangerous format
+
+from collections import defaultdict
+from operator import itemgetter
+from os.path import join
+from platform import system
+from sys import platform
+from time import gmtime, localtime, strftime
+
+from config import applongname, appversion, config
+from market import items, timestamp
+
+bracketmap = { 0: '?',
+               1: 'L',
+               2: 'M',
+               3: 'H', }
+
+
+def export(entry):
+    # entry is a Market journal entry with Items
+    querytime = timestamp(entry)
+
+    filename = join(config.get('outdir'), '%s.%s.%s.prices' % (entry['StarSystem'].strip(), entry['StationName'].strip(), strftime('%Y-%m-%dT%H.%M.%S', localtime(querytime))))
+
+    with open(filename, 'wt', encoding='utf-8') as h:
+        h.write('#! trade.py import -\n# Created by %s %s on %s.\n#\n# <item name> <sellCR> <buyCR> <demand> <stock> <timestamp>\n\n@ %s/%s\n' % (
+            applongname, appversion, platform == 'darwin' and "Mac OS" or system(), entry['StarSystem'].strip(), entry['StationName'].strip()))
+
+        # sort commodities by category
+        bycategory = defaultdict(list)
+        for commodity in items(entry):
+            bycategory[commodity['category']].append(commodity)
+
+        timestamp_text = strftime('%Y-%m-%d %H:%M:%S', gmtime(querytime))
+        for category in sorted(bycategory):
+            h.write('   + %s\n' % category)
+            # corrections to commodity names can change the sort order
+            for commodity in sorted(bycategory[category], key=itemgetter('name')):
+                h.write('      {:<23} {:7d} {:7d} {:9}{:1} {:8}{:1}  {}\n'.format(
+                    commodity['name'], int(commodity['sellPrice']), int(commodity['buyPrice']),
+                    int(commodity['demand']) if commodity['demandBracket'] else '',
+                    bracketmap[commodity['demandBracket']],
+                    int(commodity['stock']) if commodity['stockBracket'] else '',
+                    bracketmap[commodity['stockBracket']],
+                    timestamp_text))
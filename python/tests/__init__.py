@@ -0,0 +1,3 @@
+#
+# Tests. Not shipped - run from the python folder e.g. "py -m unittest discover tests".
+#
@@ -0,0 +1,97 @@
+#
+# The Linux backend's debounced, atomic save.
+#
+
+import os
+from os.path import exists, join
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from config import Config
+
+
+@unittest.skipUnless(sys.platform == 'linux', 'Linux backend')
+class TestLinuxSave(unittest.TestCase):
+
+    DELAY = 0.2
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        environ = mock.patch.dict(os.environ, { 'XDG_DATA_HOME': join(self.dir, 'data'), 'XDG_CONFIG_HOME': join(self.dir, 'config') })
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.config = self.open()
+        self.addCleanup(lambda: self.config.close())
+
+    def open(self):
+        config = Config()
+        config.SAVE_DELAY = self.DELAY
+        self.saves = 0
+        save = config._save
+        def counted():
+            self.saves += 1
+            save()
+        config._save = counted
+        return config
+
+    def reopen(self):
+        self.config.close()
+        self.config = self.open()
+
+    def test_debounced(self):
+        self.config.save()	# _open sets outdir
+        self.saves = 0
+        threads = threading.active_count()
+        for i in range(20):
+            self.config.set('test', i)
+            time.sleep(self.DELAY / 20)
+        self.assertEqual(self.saves, 0)	# still changing
+        self.assertLessEqual(threading.active_count(), threads + 1)	# one saver thread, not one per change
+        time.sleep(self.DELAY * 3)
+        self.assertEqual(self.saves, 1)
+        self.reopen()
+        self.assertEqual(self.config.getint('test'), 19)	# from disk
+
+    def test_saved_on_close(self):
+        self.config.set('test', 'value')
+        self.config.close()
+        self.assertEqual(self.saves, 1)
+        self.reopen()
+        self.assertEqual(self.config.get('test'), 'value')
+
+    def test_atomic(self):
+        self.config.set('test', 'old')
+        self.reopen()
+        filename = self.config.filename
+        with open(filename, 'rb') as h:
+            before = h.read()
+        self.config.set('test', 'new')
+        with mock.patch('os.replace', side_effect=OSError('interrupted')):
+            with self.assertRaises(OSError):
+                self.config.save()
+        with open(filename, 'rb') as h:
+            self.assertEqual(h.read(), before)	# old file untouched
+        self.config.save()
+        self.assertFalse(exists(filename + '.tmp'))
+        self.reopen()
+        self.assertEqual(self.config.get('test'), 'new')
+
+    def test_change_after_close(self):
+        self.config.set('test', 'value')
+        self.config.close()
+        self.config.set('test', 'changed')	# ignored
+        self.config.delete('test')
+        self.config.save()
+        self.assertEqual(self.saves, 1)
+        self.reopen()
+        self.assertEqual(self.config.get('test'), 'value')
+
+
+if __name__ == '__main__':
+    unittest.main()
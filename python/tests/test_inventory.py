@@ -0,0 +1,74 @@
+#
+# Cargo and materials as plugins and state_at() callers get them - read-only dicts that can be copied and pickled.
+#
+
+import copy
+import json
+import pickle
+import types
+import unittest
+
+from monitor import EDLogs
+import plug
+
+JOURNAL = [
+    { 'timestamp': '3306-01-01T00:00:00Z', 'event': 'Fileheader', 'gameversion': '3.7' },
+    { 'timestamp': '3306-01-01T00:00:01Z', 'event': 'LoadGame', 'Commander': 'Test', 'GameMode': 'Solo', 'Credits': 1000, 'Loan': 0, 'Horizons': True },
+    { 'timestamp': '3306-01-01T00:00:02Z', 'event': 'Materials', 'Raw': [{ 'Name': 'carbon', 'Count': 5 }], 'Manufactured': [], 'Encoded': [] },
+    { 'timestamp': '3306-01-01T00:00:03Z', 'event': 'Cargo', 'Vessel': 'Ship', 'Inventory': [{ 'Name': 'gold', 'Count': 3 }] },
+    { 'timestamp': '3306-01-01T00:00:04Z', 'event': 'MarketBuy', 'Type': 'tea', 'Count': 2, 'BuyPrice': 10, 'TotalCost': 20 },
+]
+
+
+class TestInventoryDict(unittest.TestCase):
+
+    def setUp(self):
+        self.monitor = EDLogs()
+        self.monitor.record_history()
+        self.plugin_states = []
+        def journal_entry(cmdr, is_beta, system, station, entry, state):
+            self.plugin_states.append(state)
+        plugin = plug.Plugin('test', None)
+        plugin.module = types.SimpleNamespace(journal_entry=journal_entry)
+        plugins = plug.PLUGINS[:]
+        plug.PLUGINS[:] = [plugin]
+        self.addCleanup(plug.PLUGINS.__setitem__, slice(None), plugins)
+        for entry in JOURNAL:
+            entry = self.monitor.parse_entry(json.dumps(entry))
+            plug.notify_journal_entry(None, False, None, None, entry, self.monitor.state)
+
+    def check(self, state):
+        cargo = state['Cargo']
+        self.assertEqual(cargo, { 'gold': 3, 'tea': 2 })
+        self.assertEqual(state['Raw'], { 'carbon': 5 })
+        with self.assertRaises(TypeError):
+            cargo['gold'] = 1
+
+        for copied in [copy.copy(cargo), copy.deepcopy(cargo)]:
+            self.assertEqual(copied, cargo)
+            self.assertEqual(copied['missing'], 0)
+            copied['gold'] = 1	# changeable
+            self.assertEqual(cargo['gold'], 3)
+
+        unpickled = pickle.loads(pickle.dumps(cargo))
+        self.assertEqual(unpickled, cargo)
+        self.assertEqual(unpickled.delta, cargo.delta)
+        self.assertEqual(unpickled['missing'], 0)
+
+        # and as part of the whole state
+        self.assertEqual(copy.deepcopy(state)['Cargo'], cargo)
+        self.assertEqual(pickle.loads(pickle.dumps(state))['Cargo'], cargo)
+        copy.copy(state)
+
+    def test_plugin_state(self):
+        state = self.plugin_states[-1]
+        self.check(state)
+        self.assertEqual(state['Cargo'].delta, { 'tea': 2 })
+
+    def test_state_at(self):
+        self.check(self.monitor.state_at('3306-01-01T00:00:04Z'))
+        self.assertEqual(self.monitor.state_at('3306-01-01T00:00:03Z')['Cargo'], { 'gold': 3 })
+
+
+if __name__ == '__main__':
+    unittest.main()
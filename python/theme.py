@@ -7,6 +7,7 @@
 
 from sys import platform
 from os.path import join
+from weakref import WeakKeyDictionary
 
 import tkinter as tk
 from tkinter import ttk
@@ -103,10 +104,21 @@ class _Theme(object):
     def __init__(self):
         self.active = None	# Starts out with no theme
         self.minwidth = None
-        self.widgets = {}
+        self.widgets = WeakKeyDictionary()	# Widgets are dropped when destroyed, so plugins that rebuild their frames don't leak
         self.widgets_pair = []
         self.defaults = {}
         self.current = {}
+        self.generation = 0	# Incremented whenever self.current changes
+        self.applied = WeakKeyDictionary()	# Generation last applied to each widget
+        self.font = None	# Euro Caps, created on first use. Kept so that the palette compares equal
+        self.classkeys = {}	# Options supported by each widget class
+
+    # Asking a widget for its options is a Tk round trip, so only ask once per class
+    def _keys(self, widget):
+        keys = self.classkeys.get(type(widget))
+        if keys is None:
+            keys = self.classkeys[type(widget)] = frozenset(widget.keys())
+        return keys
 
     def register(self, widget):
         # Note widget and children for later application of a theme. Note if the widget has explicit fg or bg attributes.
@@ -141,10 +153,10 @@ class _Theme(object):
                     attribs.add('fg')
                 if widget['background'] not in ['', self.defaults['entrybg']]:
                     attribs.add('bg')
-                if 'font' in widget.keys() and str(widget['font']) not in ['', self.defaults['entryfont']]:
+                if 'font' in self._keys(widget) and str(widget['font']) not in ['', self.defaults['entryfont']]:
                     attribs.add('font')
             elif isinstance(widget, tk.Frame) or isinstance(widget, ttk.Frame) or isinstance(widget, tk.Canvas):
-                if ('background' in widget.keys() or isinstance(widget, tk.Canvas)) and widget['background'] not in ['', self.defaults['frame']]:
+                if ('background' in self._keys(widget) or isinstance(widget, tk.Canvas)) and widget['background'] not in ['', self.defaults['frame']]:
                     attribs.add('bg')
             elif isinstance(widget, HyperlinkLabel):
                 pass    # Hack - HyperlinkLabel changes based on state, so skip
@@ -156,18 +168,31 @@ class _Theme(object):
                 if widget['font'] not in ['', self.defaults['menufont']]:
                     attribs.add('font')
             else:      # tk.Button, tk.Label
-                if 'foreground' in widget.keys() and widget['foreground'] not in ['', self.defaults['fg']]:
+                if 'foreground' in self._keys(widget) and widget['foreground'] not in ['', self.defaults['fg']]:
                     attribs.add('fg')
-                if 'background' in widget.keys() and widget['background'] not in ['', self.defaults['bg']]:
+                if 'background' in self._keys(widget) and widget['background'] not in ['', self.defaults['bg']]:
                     attribs.add('bg')
-                if 'font' in widget.keys() and widget['font'] not in ['', self.defaults['font']]:
+                if 'font' in self._keys(widget) and widget['font'] not in ['', self.defaults['font']]:
                     attribs.add('font')
             self.widgets[widget] = attribs
+            if isinstance(widget, tk.Widget):
+                widget.bind('<Destroy>', self._destroyed, add='+')
 
         if isinstance(widget, tk.Frame) or isinstance(widget, ttk.Frame):
             for child in widget.winfo_children():
                 self.register(child)
 
+    def _destroyed(self, event):
+        # event.widget is just the name if tkinter has already forgotten the widget, in which case the weak reference
+        # takes care of it
+        if isinstance(event.widget, tk.Misc):
+            self.widgets.pop(event.widget, None)
+            self.applied.pop(event.widget, None)
+
+    # Number of registered widgets that are still alive
+    def registered(self):
+        return len(self.widgets)
+
     def register_alternate(self, pair, gridopts):
         self.widgets_pair.append((pair, gridopts))
 
@@ -205,7 +230,9 @@ class _Theme(object):
         if theme:
             # Dark
             (r, g, b) = root.winfo_rgb(config.get('dark_text'))
-            self.current = {
+            if theme > 1 and not self.font:
+                self.font = tkFont.Font(family='Euro Caps', size=10, weight=tkFont.NORMAL)
+            current = {
                 'background'         : 'grey4',	# OSX inactive dark titlebar color
                 'foreground'         : config.get('dark_text'),
                 'activebackground'   : config.get('dark_text'),
@@ -214,13 +241,13 @@ class _Theme(object):
                 'highlight'          : config.get('dark_highlight'),
                 # Font only supports Latin 1 / Supplement / Extended, and a few General Punctuation and Mathematical Operators
                 'font'               : (theme > 1 and not 0x250 < ord(_('Cmdr')[0]) < 0x3000 and
-                                        tkFont.Font(family='Euro Caps', size=10, weight=tkFont.NORMAL) or
+                                        self.font or
                                         'TkDefaultFont'),
             }
         else:
             # (Mostly) system colors
             style = ttk.Style()
-            self.current = {
+            current = {
                 'background'         : (platform == 'darwin' and 'systemMovableModalBackground' or
                                         style.lookup('TLabel', 'background')),
                 'foreground'         : style.lookup('TLabel', 'foreground'),
@@ -233,6 +260,10 @@ class _Theme(object):
                 'font'               : 'TkDefaultFont',
             }
 
+        if current != self.current:
+            self.current = current
+            self.generation += 1
+
 
     # Apply current theme to a widget and its children, and register it for future updates
     def update(self, widget):
@@ -241,59 +272,71 @@ class _Theme(object):
             return	# No need to call this for widgets created in plugin_app()
         self.register(widget)
         self._update_widget(widget)
+        self.applied[widget] = self.generation
         if isinstance(widget, tk.Frame) or isinstance(widget, ttk.Frame):
             for child in widget.winfo_children():
                 self._update_widget(child)
+                self.applied[child] = self.generation
 
-    # Apply current theme to a single widget
+    # Apply current theme to a single widget, with a single configure
     def _update_widget(self, widget):
         assert widget in self.widgets, '%s %s "%s"' %(widget.winfo_class(), widget, 'text' in widget.keys() and widget['text'])
         attribs = self.widgets.get(widget, [])
+        current = self.current
+        opts = {}
 
         if isinstance(widget, tk.BitmapImage):
             # not a widget
             if 'fg' not in attribs:
-                widget.configure(foreground = self.current['foreground']),
+                opts['foreground'] = current['foreground']
             if 'bg' not in attribs:
-                widget.configure(background = self.current['background'])
-        elif 'cursor' in widget.keys() and str(widget['cursor']) not in ['', 'arrow']:
+                opts['background'] = current['background']
+            if opts:
+                widget.configure(**opts)
+            return
+
+        keys = self._keys(widget)
+        if 'cursor' in keys and str(widget['cursor']) not in ['', 'arrow']:
             # Hack - highlight widgets like HyperlinkLabel with a non-default cursor
             if 'fg' not in attribs:
-                widget.configure(foreground = self.current['highlight']),
-                if 'insertbackground' in widget.keys():	# tk.Entry
-                    widget.configure(insertbackground = self.current['foreground']),
+                opts['foreground'] = current['highlight']
+                if 'insertbackground' in keys:	# tk.Entry
+                    opts['insertbackground'] = current['foreground']
             if 'bg' not in attribs:
-                widget.configure(background = self.current['background'])
-                if 'highlightbackground' in widget.keys():	# tk.Entry
-                    widget.configure(highlightbackground = self.current['background'])
+                opts['background'] = current['background']
+                if 'highlightbackground' in keys:	# tk.Entry
+                    opts['highlightbackground'] = current['background']
             if 'font' not in attribs:
-                widget.configure(font = self.current['font'])
-        elif 'activeforeground' in widget.keys():
+                opts['font'] = current['font']
+        elif 'activeforeground' in keys:
             # e.g. tk.Button, tk.Label, tk.Menu
             if 'fg' not in attribs:
-                widget.configure(foreground = self.current['foreground'],
-                                 activeforeground = self.current['activeforeground'],
-                                 disabledforeground = self.current['disabledforeground'])
+                opts['foreground'] = current['foreground']
+                opts['activeforeground'] = current['activeforeground']
+                opts['disabledforeground'] = current['disabledforeground']
             if 'bg' not in attribs:
-                widget.configure(background = self.current['background'],
-                                 activebackground = self.current['activebackground'])
+                opts['background'] = current['background']
+                opts['activebackground'] = current['activebackground']
                 if platform == 'darwin' and isinstance(widget, tk.Button):
-                    widget.configure(highlightbackground = self.current['background'])
+                    opts['highlightbackground'] = current['background']
             if 'font' not in attribs:
-                widget.configure(font = self.current['font'])
-        elif 'foreground' in widget.keys():
+                opts['font'] = current['font']
+        elif 'foreground' in keys:
             # e.g. ttk.Label
             if 'fg' not in attribs:
-                widget.configure(foreground = self.current['foreground']),
+                opts['foreground'] = current['foreground']
             if 'bg' not in attribs:
-                widget.configure(background = self.current['background'])
+                opts['background'] = current['background']
             if 'font' not in attribs:
-                widget.configure(font = self.current['font'])
-        elif 'background' in widget.keys() or isinstance(widget, tk.Canvas):
+                opts['font'] = current['font']
+        elif 'background' in keys or isinstance(widget, tk.Canvas):
             # e.g. Frame, Canvas
             if 'bg' not in attribs:
-                widget.configure(background = self.current['background'],
-                                 highlightbackground = self.current['disabledforeground'])
+                opts['background'] = current['background']
+                opts['highlightbackground'] = current['disabledforeground']
+
+        if opts:
+            widget.configure(**opts)
 
 
     # Apply configured theme
@@ -302,12 +345,11 @@ class _Theme(object):
         theme = config.getint('theme')
         self._colors(root, theme)
 
-        # Apply colors
+        # Apply colors to widgets that were registered or last themed before the palette changed
         for widget in set(self.widgets):
-            if isinstance(widget, tk.Widget) and not widget.winfo_exists():
-                self.widgets.pop(widget)	# has been destroyed
-            else:
+            if self.applied.get(widget) != self.generation:
                 self._update_widget(widget)
+                self.applied[widget] = self.generation
 
         # Switch menus
         for pair, gridopts in self.widgets_pair:
@@ -1,5 +1,4 @@
 from sys import platform
-import webbrowser
 
 import tkinter as tk
 from tkinter import ttk
@@ -143,4 +142,5 @@ def openurl(url):
             except:
                 pass
 
+    import webbrowser	# not needed til first click
     webbrowser.open(url)